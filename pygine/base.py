@@ -22,5 +22,5 @@ class PygineObject(object):
     def set_location(self, x, y):
         self.x = x
         self.y = y
-        self.location = Vector2(self.x, self.y)
+        self.location.set(self.x, self.y)
         self.bounds = Rect(self.x, self.y, self.width, self.height)
@@ -3,11 +3,17 @@ from pygine.maths import Vector2
 from pygine.utilities import Camera, Color, CameraType, StaticCamera
 
 
+# Every draw call writes its screen location into this one vector instead of allocating a new one.
+__location = Vector2()
+
+
 def __scaled_location(x, y, camera_type):
     if camera_type == CameraType.DYNAMIC:
-        return Vector2(x * Camera.scale - Camera.top_left.x, y * Camera.scale - Camera.top_left.y)
+        __location.set(x * Camera.scale - Camera.top_left.x, y * Camera.scale - Camera.top_left.y)
+        return __location
     if camera_type == CameraType.STATIC:
-        return Vector2(x * StaticCamera.scale - StaticCamera.top_left.x, y * StaticCamera.scale - StaticCamera.top_left.y)
+        __location.set(x * StaticCamera.scale - StaticCamera.top_left.x, y * StaticCamera.scale - StaticCamera.top_left.y)
+        return __location
 
 
 def __scaled_value(value):
@@ -15,12 +21,13 @@ def __scaled_value(value):
 
 
 def draw_rectangle(surface, rect, camera_type, color=Color.WHITE, thickness=0):
+    location = __scaled_location(rect.x, rect.y, camera_type)
     pygame.draw.rect(
         surface,
         color,
         (
-            __scaled_location(rect.x, rect.y, camera_type).x,
-            __scaled_location(rect.x, rect.y, camera_type).y,
+            location.x,
+            location.y,
             __scaled_value(rect.width),
             __scaled_value(rect.height)
         ),
@@ -29,34 +36,57 @@ def draw_rectangle(surface, rect, camera_type, color=Color.WHITE, thickness=0):
 
 
 def draw_line(surface, x1, y1, x2, y2, camera_type, color=Color.WHITE, thickness=1):
+    start = __scaled_location(x1, y1, camera_type)
+    start = [start.x, start.y]
+    end = __scaled_location(x2, y2, camera_type)
+    end = [end.x, end.y]
     pygame.draw.line(
         surface,
         color,
-        [
-            __scaled_location(x1, y1, camera_type).x,
-            __scaled_location(x1, y1, camera_type).y
-        ],
-        [
-            __scaled_location(x2, y2, camera_type).x,
-            __scaled_location(x2, y2, camera_type).y
-        ],
+        start,
+        end,
         int(__scaled_value(thickness))
     )
 
 
 def draw_circle(surface, center, radius, camera_type, color=Color.WHITE, thickness=0):
+    location = __scaled_location(center.x, center.y, camera_type)
     pygame.draw.circle(
         surface,
         color,
         (
-            int(__scaled_location(center.x, center.y, camera_type).x),
-            int(__scaled_location(center.x, center.y, camera_type).y),
+            int(location.x),
+            int(location.y),
         ),
         int(__scaled_value(radius)),
         int(__scaled_value(thickness))
     )
 
 
+def draw_images(surface, image, width, height, locations, camera_type):
+    "Draws the same width by height image at every (x, y) in locations, scaling it once and blitting everything in a single call."
+    image = pygame.transform.scale(
+        image,
+        (
+            int(__scaled_value(width)),
+            int(__scaled_value(height))
+        )
+    )
+    if camera_type == CameraType.DYNAMIC:
+        scale = Camera.scale
+        left = Camera.top_left.x
+        top = Camera.top_left.y
+    else:
+        scale = StaticCamera.scale
+        left = StaticCamera.top_left.x
+        top = StaticCamera.top_left.y
+
+    surface.blits(
+        [(image, (x * scale - left, y * scale - top)) for x, y in locations],
+        False
+    )
+
+
 def draw_image(surface, image, rect, camera_type):
     image = pygame.transform.scale(
         image,
@@ -65,10 +95,11 @@ def draw_image(surface, image, rect, camera_type):
             int(__scaled_value(rect.height))
         )
     )
+    location = __scaled_location(rect.x, rect.y, camera_type)
     surface.blit(
         image,
         (
-            __scaled_location(rect.x, rect.y, camera_type).x,
-            __scaled_location(rect.x, rect.y, camera_type).y
+            location.x,
+            location.y
         )
     )
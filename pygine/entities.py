@@ -7,9 +7,11 @@ from pygine.draw import draw_rectangle
 from pygine.geometry import Rectangle, Circle
 from pygine import globals
 from pygine.input import InputType, pressed, pressing
-from pygine.maths import Vector2
-from pygine.resource import Sprite, SpriteType
+from pygine.maths import SubpixelVector2, Vector2
+from pygine.physics import CollisionLayer, ContactCache, time_of_impact
+from pygine.resource import Sprite, SpriteType, get_solid_mask
 from pygine.sounds import play_sound
+from pygine.structures import Ray
 from pygine.utilities import CameraType, Color, Timer
 from random import randint
 
@@ -20,6 +22,14 @@ class Entity(PygineObject):
         self.color = Color.WHITE
         self.layer = 0
         self.remove = False
+        # Sleeping entities are skipped by the update loop until something wakes them.
+        self.sleeping = False
+        # Entities with a mask_sprite collide with its pixels, drawn mask_offset away from their location, once their bounds overlap.
+        self.mask_sprite = None
+        self.mask_offset = (0, 0)
+        # Pairs are only dispatched when each entity's layer is in the other's mask.
+        self.collision_layer = CollisionLayer.NONE
+        self.collision_mask = CollisionLayer.NONE
         self.__bounds_that_actually_draw_correctly = Rectangle(
             self.x, self.y, self.width, self.height, self.color, 2)
 
@@ -31,6 +41,32 @@ class Entity(PygineObject):
         super(Entity, self).set_location(x, y)
         self.__bounds_that_actually_draw_correctly.set_location(self.x, self.y)
 
+    def overlaps_pixels(self, other):
+        "A narrowphase for entities whose bounds already overlap. Entities without a mask_sprite are solid rectangles."
+        if self.mask_sprite == None and other.mask_sprite == None:
+            return True
+
+        mask, x, y = self.__mask()
+        other_mask, other_x, other_y = other.__mask()
+
+        return mask.overlap(other_mask, (other_x - x, other_y - y)) != None
+
+    def __mask(self):
+        if self.mask_sprite == None:
+            return get_solid_mask(self.bounds.width, self.bounds.height), self.bounds.x, self.bounds.y
+
+        return (
+            self.mask_sprite.get_mask(),
+            int(self.x + self.mask_offset[0]),
+            int(self.y + self.mask_offset[1])
+        )
+
+    def sleep(self):
+        self.sleeping = True
+
+    def wake(self):
+        self.sleeping = False
+
     def update(self, delta_time, scene_data):
         raise NotImplementedError(
             "A class that inherits Entity did not implement the update(delta_time, scene_data) method")
@@ -54,52 +90,109 @@ class Direction(IntEnum):
 class Kinetic(Entity):
     def __init__(self, x, y, width, height, speed):
         super(Kinetic, self).__init__(x, y, width, height)
-        self.velocity = Vector2()
+        # Deterministic runs keep the position and velocity of a body in whole sub-pixels. The position lives in subpixel_x and subpixel_y, and x and y only mirror it.
+        self.subpixel_x = 0
+        self.subpixel_y = 0
+        if globals.deterministic:
+            self.velocity = SubpixelVector2()
+            super(Kinetic, self).set_location(*self.__snap(self.x, self.y))
+        else:
+            self.velocity = Vector2()
         self.acceleration = Vector2()
         self.default_move_speed = speed
         self.move_speed = speed
         self.facing = Direction.NONE
-        self.collision_rectangles = []
+        # The probes and the padded query area are owned by the body and moved in place every step.
+        self.collision_rectangles = [
+            Rect(0, 0, 0, 0),
+            Rect(0, 0, 0, 0),
+            Rect(0, 0, 0, 0),
+            Rect(0, 0, 0, 0)
+        ]
         self.collision_width = 0
+        self.area = Rect(self.bounds)
+
+        # Fast bodies are swept from where they started each step, so they cannot pass through thin objects between steps.
+        self.fast = False
+        self.sweep_start = Rect(self.bounds)
+        self.swept_bounds = Rect(self.bounds)
+
+    def set_location(self, x, y):
+        if globals.deterministic:
+            x, y = self.__snap(x, y)
+        super(Kinetic, self).set_location(x, y)
+
+    def __snap(self, x, y):
+        "Moves the body's sub-pixels to the point on their grid closest to (x, y), and returns that point in pixels."
+        self.subpixel_x = int(round(x * SubpixelVector2.SUBPIXELS))
+        self.subpixel_y = int(round(y * SubpixelVector2.SUBPIXELS))
 
-        self.target = 1.0 / 60
-        self.accumulator = 0
+        return self.subpixel_x / float(SubpixelVector2.SUBPIXELS), self.subpixel_y / float(SubpixelVector2.SUBPIXELS)
 
     def _update_collision_rectangles(self):
         self.collision_width = 4
-        self.collision_rectangles = [
-            Rect(self.x + self.collision_width, self.y - self.collision_width,
-                 self.width - self.collision_width * 2, self.collision_width),
-            Rect(self.x + self.collision_width, self.y + self.height, self.width -
-                 self.collision_width * 2, self.collision_width),
-            Rect(self.x - self.collision_width, self.y + self.collision_width,
-                 self.collision_width, self.height - self.collision_width * 2),
-            Rect(self.x + self.width, self.y + self.collision_width,
-                 self.collision_width, self.height - self.collision_width * 2)
-        ]
+        self.collision_rectangles[0].update(
+            self.x + self.collision_width, self.y - self.collision_width,
+            self.width - self.collision_width * 2, self.collision_width)
+        self.collision_rectangles[1].update(
+            self.x + self.collision_width, self.y + self.height,
+            self.width - self.collision_width * 2, self.collision_width)
+        self.collision_rectangles[2].update(
+            self.x - self.collision_width, self.y + self.collision_width,
+            self.collision_width, self.height - self.collision_width * 2)
+        self.collision_rectangles[3].update(
+            self.x + self.width, self.y + self.collision_width,
+            self.collision_width, self.height - self.collision_width * 2)
+
+    def _update_area(self, padding):
+        "Moves the area around the body that its queries use, padded on every side."
+        self.area.update(
+            self.x - padding,
+            self.y - padding,
+            self.width + padding * 2,
+            self.height + padding * 2
+        )
 
     def _calculate_scaled_speed(self, delta_time):
         self.move_speed = self.default_move_speed * delta_time
 
     def _apply_force(self, delta_time):
         # Semi-Implict Euler Integrator
-        self.velocity = Vector2(
-            self.velocity.x + self.acceleration.x * delta_time,
-            self.velocity.y + self.acceleration.y * delta_time
-        )
+        self.velocity.add_scaled(self.acceleration, delta_time)
         self.set_location(
             self.x + self.velocity.x * delta_time,
             self.y + self.velocity.y * delta_time
         )
 
-    def _simulate(self, elapsed_time, scene_data):
-        self.accumulator += elapsed_time
+    def can_sleep(self):
+        "Whether the body is at rest, and can stop being updated until something wakes it."
+        return (
+            self.velocity.x == 0 and self.velocity.y == 0 and
+            self.acceleration.x == 0 and self.acceleration.y == 0
+        )
+
+    def begin_sweep(self):
+        self.sweep_start.update(self.bounds)
 
-        while(self.accumulator >= self.target):
-            self._apply_force(self.target)
-            self._collision(scene_data)
+    def end_sweep(self):
+        self.swept_bounds.update(self.sweep_start)
+        self.swept_bounds.union_ip(self.bounds)
 
-            self.accumulator -= self.target
+    def time_of_impact(self, obstacle):
+        "Returns how far through the last step this body first overlapped obstacle, from 0 to 1, or -1 if it never did."
+        if not self.fast:
+            return 0 if self.bounds.colliderect(obstacle) else -1
+
+        return time_of_impact(
+            self.sweep_start,
+            self.bounds.x - self.sweep_start.x,
+            self.bounds.y - self.sweep_start.y,
+            obstacle
+        )
+
+    def _simulate(self, elapsed_time, scene_data):
+        # The scene steps every scheduled body together once all of them were updated.
+        scene_data.simulation_clock.schedule(self)
 
     def _collision(self, scene_data):
         raise NotImplementedError(
@@ -170,29 +263,15 @@ class Gun(Entity):
                 if (extra_velocity > 0):
                     extra = extra_velocity
 
-            # Create Bullet
-            scene_data.entity_buffer.append(
-                Bullet(
-                    x, y,
-                    Vector2(direction * self.bullet_speed + extra, 0),
-                    self.bullet_travel,
-                    self.bullet_damage
-                )
-            )
+            self.__create_bullet(
+                x, y, direction * self.bullet_speed + extra, 0, scene_data)
         else:
             direction = -1
             if (extra_velocity < 0):
                 extra = extra_velocity
 
-            # Create Bullet
-            scene_data.entity_buffer.append(
-                Bullet(
-                    x, y,
-                    Vector2(0, direction * self.bullet_speed + extra),
-                    self.bullet_travel,
-                    self.bullet_damage
-                )
-            )
+            self.__create_bullet(
+                x, y, 0, direction * self.bullet_speed + extra, scene_data)
 
         self.can_shoot = False
         self.timer_frequency.reset()
@@ -200,6 +279,25 @@ class Gun(Entity):
 
         play_sound("shoot.wav", 0.15)
 
+    def __create_bullet(self, x, y, velocity_x, velocity_y, scene_data):
+        # Scenes that batch their projectiles keep bullets in arrays instead of entities.
+        if (scene_data.projectiles != None):
+            scene_data.projectiles.fire(
+                x, y,
+                velocity_x, velocity_y,
+                self.bullet_travel,
+                self.bullet_damage
+            )
+        else:
+            scene_data.entity_buffer.append(
+                scene_data.bullet_pool.acquire(
+                    x, y,
+                    velocity_x, velocity_y,
+                    self.bullet_travel,
+                    self.bullet_damage
+                )
+            )
+
     def set_location(self, x, y):
         super(Gun, self).set_location(x, y)
         self.sprite.set_location(self.x, self.y)
@@ -217,7 +315,26 @@ class Bullet(Kinetic):
     def __init__(self, x, y, velocity, travel, damage):
         super(Bullet, self).__init__(x, y, 16, 16, 0)
         self.sprite = Sprite(self.x, self.y, SpriteType.BULLET)
-        self.velocity = velocity
+        self.velocity.set(velocity.x, velocity.y)
+        self.fast = True
+        self.collision_layer = CollisionLayer.PLAYER_BULLET
+        self.collision_mask = CollisionLayer.BOSS | CollisionLayer.BOSS_HAZARD
+
+        self.travel = travel
+        self.damage = damage
+
+        self.starting_x = x
+        self.starting_y = y
+
+    def reset(self, x, y, velocity_x, velocity_y, travel, damage):
+        "Prepares a released bullet to be fired again, as if it was just created."
+        self.set_location(x, y)
+        self.velocity.set(velocity_x, velocity_y)
+        self.acceleration.set(0, 0)
+        self.sweep_start.update(self.bounds)
+        self.swept_bounds.update(self.bounds)
+        self.remove = False
+        self.wake()
 
         self.travel = travel
         self.damage = damage
@@ -252,6 +369,43 @@ class Bullet(Kinetic):
             self.sprite.draw(surface, CameraType.STATIC)
 
 
+class BulletPool:
+    """
+    Recycles the bullets a scene removed, so sustained fire does not keep allocating sprites and surfaces.
+    Guns only fire Bullet entities when the scene has no ProjectileManager, which is when NumPy is missing or the game is deterministic.
+    """
+
+    def __init__(self):
+        self.__free = []
+        # How many bullets were ever created, how many are out right now, and the most that were ever out at once.
+        self.created = 0
+        self.in_use = 0
+        self.high_water_mark = 0
+
+    def acquire(self, x, y, velocity_x, velocity_y, travel, damage):
+        if len(self.__free) > 0:
+            bullet = self.__free.pop()
+            bullet.reset(x, y, velocity_x, velocity_y, travel, damage)
+        else:
+            bullet = Bullet(x, y, Vector2(velocity_x, velocity_y), travel, damage)
+            self.created += 1
+
+        self.in_use += 1
+        if self.in_use > self.high_water_mark:
+            self.high_water_mark = self.in_use
+
+        return bullet
+
+    def release(self, bullet):
+        "Takes back a bullet the scene no longer holds. It must not be used again until it is acquired."
+        self.in_use -= 1
+        self.__free.append(bullet)
+
+    def clear(self):
+        del self.__free[:]
+        self.in_use = 0
+
+
 class BasicGun(Gun):
     def __init__(self, x, y):
         super(BasicGun, self).__init__(x, y)
@@ -287,7 +441,10 @@ class Player(Actor):
     def __init__(self, x, y):
         super(Player, self).__init__(x, y, 16, 32, 90)
         self.sprite = Sprite(self.x, self.y, SpriteType.NONE)
-        self.query_result = None
+        self.query_result = []
+        self.contact_cache = ContactCache(16)
+        self.collision_layer = CollisionLayer.PLAYER
+        self.collision_mask = CollisionLayer.BOSS_HAZARD | CollisionLayer.TERRAIN
 
         self.jump_height = 16 * 5 + 4
         self.jump_duration = 0.5
@@ -301,7 +458,7 @@ class Player(Actor):
         self.friction = 150
         self.drag = 50
 
-        self.velocity = Vector2(0, 0)
+        self.velocity.set(0, 0)
         self.acceleration = Vector2(0, self.gravity)
 
         self.grounded = False
@@ -321,6 +478,8 @@ class Player(Actor):
         self.flashing = False
 
         self.entered_arena = False
+        # Nothing about a player changes until it enters the arena.
+        self.sleep()
 
         self.area = Rect(
             self.x - 8,
@@ -330,7 +489,7 @@ class Player(Actor):
         )
 
     def reset(self):
-        self.velocity = Vector2(0, 0)
+        self.velocity.set(0, 0)
         self.acceleration = Vector2(0, self.gravity)
 
         self.grounded = False
@@ -342,6 +501,9 @@ class Player(Actor):
         self.flashing = False
 
         self.entered_arena = False
+        # Nothing about a player changes until it enters the arena.
+        self.sleep()
+        self.contact_cache.clear()
 
     def take_damage(self):
         if (self.damaged):
@@ -361,6 +523,7 @@ class Player(Actor):
 
     def enter_arena(self):
         self.entered_arena = True
+        self.wake()
 
     def __update_health(self, delta_time):
         if (not self.damaged or self.dead):
@@ -428,9 +591,11 @@ class Player(Actor):
         # Bottom
         if self.collision_rectangles[0].colliderect(entity.bounds) and self.velocity.y < 0:
             self.set_location(self.x, entity.bounds.bottom)
+            self.contact_cache.separate(entity, Direction.UP)
         # Top
         if self.collision_rectangles[1].colliderect(entity.bounds) and self.velocity.y > 0:
             self.set_location(self.x, entity.bounds.top - self.bounds.height)
+            self.contact_cache.separate(entity, Direction.DOWN)
 
             self.velocity.y = 0
             self.grounded = True
@@ -439,9 +604,11 @@ class Player(Actor):
         # Right
         if self.collision_rectangles[2].colliderect(entity.bounds) and self.velocity.x < 0:
             self.set_location(entity.bounds.right, self.y)
+            self.contact_cache.separate(entity, Direction.LEFT)
         # Left
         if self.collision_rectangles[3].colliderect(entity.bounds) and self.velocity.x > 0:
             self.set_location(entity.bounds.left - self.bounds.width, self.y)
+            self.contact_cache.separate(entity, Direction.RIGHT)
 
     def _collision(self, scene_data):
         self._update_collision_rectangles()
@@ -453,14 +620,11 @@ class Player(Actor):
             for e in scene_data.entities:
                 e.set_color(Color.WHITE)
 
-        self.area = Rect(
-            self.x - 16,
-            self.y - 16,
-            self.width + 16 * 2,
-            self.height + 16 * 2
-        )
+        self._update_area(16)
 
-        self.query_result = scene_data.entity_quad_tree.query(self.area)
+        # Whatever the player was resting against last step is checked first, and the broadphase is only asked again once the player moves away.
+        self.query_result = self.contact_cache.query(
+            scene_data.static_bvh, self.area, Block)
 
         self.grounded = False
 
@@ -474,15 +638,11 @@ class Player(Actor):
             self.velocity.x = -self.velocity.x * 0.75
 
         for e in self.query_result:
-            if e is self:
-                continue
-
             if (globals.debugging):
                 e.set_color(Color.RED)
 
-            if isinstance(e, Block):
-                self.__rectanlge_collision_logic(e)
-                self._update_collision_rectangles()
+            self.__rectanlge_collision_logic(e)
+            self._update_collision_rectangles()
 
     def update(self, delta_time, scene_data):
         if (not self.entered_arena):
@@ -518,6 +678,8 @@ class PlayerA(Player):
     def __init__(self, x, y):
         super(PlayerA, self).__init__(x, y)
         self.sprite = Sprite(self.x - 9, self.y - 16, SpriteType.PLAYERA)
+        self.mask_sprite = self.sprite
+        self.mask_offset = (-9, -16)
         # Character specific stuff here.
         self.gun = BasicGun(self.x - 24, self.y + 8)
         self.shooting_up = False
@@ -600,6 +762,8 @@ class PlayerB(Player):
     def __init__(self, x, y):
         super(PlayerB, self).__init__(x, y)
         self.sprite = Sprite(self.x - 9, self.y - 16, SpriteType.PLAYERB)
+        self.mask_sprite = self.sprite
+        self.mask_offset = (-9, -16)
         # Character specific stuff here.
         self.gun = WhatGun(self.x - 24, self.y + 8)
         self.shooting_up = False
@@ -697,6 +861,10 @@ class PlayerB(Player):
 class Block(Entity):
     def __init__(self, x, y, width, height):
         super(Block, self).__init__(x, y, width, height)
+        self.collision_layer = CollisionLayer.TERRAIN
+        self.collision_mask = CollisionLayer.PLAYER | CollisionLayer.BOSS_HAZARD
+        # Blocks never change, so they are never updated.
+        self.sleep()
 
     def update(self, delta_time, scene_data):
         pass
@@ -715,6 +883,8 @@ class Boss(Entity):
         self.total_health = 10000
         self.health = self.total_health
         self.dead = False
+        self.collision_layer = CollisionLayer.BOSS
+        self.collision_mask = CollisionLayer.PLAYER_BULLET
 
         self.health_bar_width = 192
         self.health_bar_position = Vector2((320 - 192) / 2, 8)
@@ -733,6 +903,10 @@ class Boss(Entity):
         self.health_bar = self.__update_health_bar()
         self.dead = False
 
+    def take_hit(self, damage):
+        "Called when a bullet hits the body of the boss."
+        self.hit(damage)
+
     def hit(self, damage):
         if (self.dead):
             return
@@ -751,6 +925,10 @@ class Boss(Entity):
             12
         )
 
+    def get_parts(self):
+        "Returns the bodies this boss owns and updates itself, instead of the scene."
+        return []
+
     def update(self, delta_time, scene_data):
         pass
 
@@ -789,6 +967,10 @@ class OctoArm(Kinetic):
         if (self.is_right):
             self.set_location(320, self.y)
             self.sprite.flip_horizontally(True)
+        self.mask_sprite = self.sprite
+        self.mask_offset = (-16, -32) if self.is_right else (0, -32)
+        # Arms only collide with anything while they attack.
+        self.collision_layer = CollisionLayer.BOSS_HAZARD
 
         self.attacking = False
         self.attack_stage = 0
@@ -813,12 +995,23 @@ class OctoArm(Kinetic):
         if (self.attacking):
             return
 
+        self.wake()
         self.attacking = True
         self.attack_stage = 0
+        self.collision_mask = CollisionLayer.PLAYER | CollisionLayer.PLAYER_BULLET
 
         direction = -1 if self.is_right else 1
         self.acceleration.x = 500 * direction
 
+    def can_sleep(self):
+        return not self.attacking and super(OctoArm, self).can_sleep()
+
+    def take_hit(self, damage):
+        self.boss.hit(damage * 0.1)
+
+    def is_harmful(self):
+        return True
+
     def _collision(self, scene_data):
         self._update_collision_rectangles()
 
@@ -826,34 +1019,15 @@ class OctoArm(Kinetic):
             for e in scene_data.entities:
                 e.set_color(Color.WHITE)
 
-        self.area = Rect(
-            self.x - 16,
-            self.y - 16,
-            self.width + 16 * 2,
-            self.height + 16 * 2
-        )
+        self._update_area(16)
 
         if (not self.attacking):
             return
 
-        self.query_result = scene_data.kinetic_quad_tree.query(self.area)
-
-        for e in self.query_result:
-            if e is self:
-                continue
-
-            if (globals.debugging):
+        if (globals.debugging):
+            for e in scene_data.kinetic_sweep.candidates(self):
                 e.set_color(Color.RED)
 
-            if isinstance(e, Bullet):
-                if (self.bounds.colliderect(e.bounds)):
-                    self.boss.hit(e.damage * 0.1)
-                    e.remove = True
-
-            if isinstance(e, Player):
-                if (self.bounds.colliderect(e.bounds)):
-                    e.take_damage()
-
     def __update_attack_logic(self):
         if (not self.attacking):
             return
@@ -901,6 +1075,7 @@ class OctoArm(Kinetic):
                 self.velocity.x = 0
 
                 self.attacking = False
+                self.collision_mask = CollisionLayer.NONE
 
     def update(self, delta_time, scene_data):
         self.__update_attack_logic()
@@ -919,6 +1094,9 @@ class OctoArm(Kinetic):
 
 
 class OctoBlaster(Kinetic):
+    # The beam is swept with parallel rays this many pixels apart, which is less than the height of a Player.
+    LASER_RAY_SPACING = 16
+
     def __init__(self, boss):
         super(OctoBlaster, self).__init__(-256, -256, 64, 64, 0)
 
@@ -927,6 +1105,8 @@ class OctoBlaster(Kinetic):
         self.color = Color.GRASS_GREEN
 
         self.sprite = Sprite(self.x, self.y, SpriteType.OCTOPUS_GUN)
+        # The blaster can only be shot while it attacks, and only its laser hurts.
+        self.collision_layer = CollisionLayer.BOSS
 
         self.attacking = False
         self.attack_stage = 0
@@ -938,6 +1118,7 @@ class OctoBlaster(Kinetic):
 
         self.laser = Rect(self.x, self.y, 0, 0)
         self.laser_detail = Rect(self.x, self.y, 0, 0)
+        self.laser_ray = Ray(0, 0, 1, 0, 0)
         self.timer_laser = Timer(2000)
 
         # Kinetic needs this
@@ -961,8 +1142,10 @@ class OctoBlaster(Kinetic):
         if (self.attacking):
             return
 
+        self.wake()
         self.attacking = True
         self.attack_stage = 0
+        self.collision_mask = CollisionLayer.PLAYER_BULLET
 
         side = randint(0, 1)
         if (side == 3):
@@ -989,6 +1172,12 @@ class OctoBlaster(Kinetic):
 
         self.timer_seek.start()
 
+    def can_sleep(self):
+        return not self.attacking and super(OctoBlaster, self).can_sleep()
+
+    def take_hit(self, damage):
+        self.boss.hit(damage * 0.1)
+
     def _collision(self, scene_data):
         self._update_collision_rectangles()
 
@@ -996,33 +1185,39 @@ class OctoBlaster(Kinetic):
             for e in scene_data.entities:
                 e.set_color(Color.WHITE)
 
-        self.area = Rect(
-            self.x - 16,
-            self.y - 16,
-            self.width + 16 * 2,
-            self.height + 16 * 2
-        )
+        self._update_area(16)
 
         if (not self.attacking):
             return
 
-        self.query_result = scene_data.kinetic_quad_tree.query(self.area)
+        if (globals.debugging):
+            for e in scene_data.kinetic_sweep.candidates(self):
+                e.set_color(Color.RED)
 
-        for e in self.query_result:
-            if e is self:
-                continue
+        if (self.attack_stage == 3):
+            self.__fire_laser(scene_data)
 
-            if (globals.debugging):
-                e.set_color(Color.RED)
+    def __fire_laser(self, scene_data):
+        # The player is tested against its current bounds. The kinetic partition is only brought up to date once per frame, so it could prune a player that just left its node.
+        player = scene_data.actor
+        if player == None:
+            return
 
-            if isinstance(e, Bullet):
-                if (self.bounds.colliderect(e.bounds)):
-                    self.boss.hit(e.damage * 0.1)
-                    e.remove = True
+        # Rays stay half a pixel inside the beam, so merely touching its edge does not count as a hit.
+        direction = 1 if self.wall == Direction.LEFT else -1
+        x = self.laser.left + 0.5 if direction > 0 else self.laser.right - 0.5
 
-        if (self.attack_stage == 3):
-            if (self.laser.colliderect(scene_data.actor.bounds)):
-                scene_data.actor.take_damage()
+        y = self.laser.top + 0.5
+        while True:
+            self.laser_ray.set(x, y, direction, 0, self.laser.width - 1)
+            if self.laser_ray.intersects(player.bounds) >= 0:
+                # The beam only hurts the player once per step, however many of its rays hit.
+                player.take_damage()
+                return
+
+            if (y >= self.laser.bottom - 0.5):
+                break
+            y = min(y + OctoBlaster.LASER_RAY_SPACING, self.laser.bottom - 0.5)
 
     def __update_laser(self):
         if (self.wall == Direction.LEFT):
@@ -1113,9 +1308,10 @@ class OctoBlaster(Kinetic):
                 (self.wall == Direction.RIGHT and self.x > 320 + 64)
             ):
                 self.acceleration = Vector2(0, 0)
-                self.velocity = Vector2(0, 0)
+                self.velocity.set(0, 0)
 
                 self.attacking = False
+                self.collision_mask = CollisionLayer.NONE
 
     def update(self, delta_time, scene_data):
         self.__update_attack_logic(delta_time, scene_data)
@@ -1185,6 +1381,9 @@ class Octopus(Boss):
 
         super(Octopus, self).reset()
 
+    def get_parts(self):
+        return [self.left_arm, self.right_arm, self.blaster]
+
     def __update_timer(self, delta_time):
         if (self.attacking):
             return
@@ -1262,19 +1461,6 @@ class Octopus(Boss):
         else:
             self.stage = 0
 
-    def __collision(self, scene_data):
-
-        self.query_result = scene_data.kinetic_quad_tree.query(self.area)
-
-        for e in self.query_result:
-            if e is self:
-                continue
-
-            if isinstance(e, Bullet):
-                if (self.bounds.colliderect(e.bounds)):
-                    self.hit(e.damage)
-                    e.remove = True
-
     def update(self, delta_time, scene_data):
         if (scene_data.actor == None):
             return
@@ -1285,11 +1471,13 @@ class Octopus(Boss):
         self.__strategize(scene_data)
         self.__await_attack_result()
 
-        self.__collision(scene_data)
-
-        self.left_arm.update(delta_time, scene_data)
-        self.right_arm.update(delta_time, scene_data)
-        self.blaster.update(delta_time, scene_data)
+        # Parts that are parked waiting for attack() sleep until then.
+        if (not self.left_arm.sleeping):
+            self.left_arm.update(delta_time, scene_data)
+        if (not self.right_arm.sleeping):
+            self.right_arm.update(delta_time, scene_data)
+        if (not self.blaster.sleeping):
+            self.blaster.update(delta_time, scene_data)
 
     def draw(self, surface):
         # Draw Body
@@ -1317,12 +1505,16 @@ class GolemPalm(Kinetic):
         super(GolemPalm, self).__init__(320, 240 - 32 - 103 / 2, 48, 48, 0)
         self.color = Color.OCEAN_BLUE
         self.sprite = Sprite(0, 64, SpriteType.GOLEM_PALM)
-        self.velocity = Vector2(-100, 0)
+        self.velocity.set(-100, 0)
         self.facing_left = facing_left
         if (not facing_left):
             self.velocity.x = abs(self.velocity.x)
             self.set_location(-71, 240 - 32 - 103 / 2)
             self.sprite.flip_horizontally(True)
+        self.mask_sprite = self.sprite
+        self.mask_offset = (-16, 0)
+        self.collision_layer = CollisionLayer.BOSS_HAZARD
+        self.collision_mask = CollisionLayer.PLAYER | CollisionLayer.PLAYER_BULLET
 
         # Kinetic needs this
         self.query_result = None
@@ -1342,6 +1534,12 @@ class GolemPalm(Kinetic):
     def __rectanlge_collision_logic(self, entity):
         pass
 
+    def take_hit(self, damage):
+        self.boss.hit(damage)
+
+    def is_harmful(self):
+        return True
+
     def _collision(self, scene_data):
         self._update_collision_rectangles()
 
@@ -1349,28 +1547,7 @@ class GolemPalm(Kinetic):
             for e in scene_data.entities:
                 e.set_color(Color.WHITE)
 
-        self.area = Rect(
-            self.x - 16,
-            self.y - 16,
-            self.width + 16 * 2,
-            self.height + 16 * 2
-        )
-
-        # Check collision against Kinetic stuff (ugly I know)
-        self.query_result = scene_data.kinetic_quad_tree.query(self.area)
-
-        for e in self.query_result:
-            if e is self:
-                continue
-
-            if isinstance(e, Bullet):
-                if (self.bounds.colliderect(e.bounds)):
-                    self.boss.hit(e.damage)
-                    e.remove = True
-
-            if isinstance(e, Player):
-                if (self.bounds.colliderect(e.bounds)):
-                    e.take_damage()
+        self._update_area(16)
 
     def update(self, delta_time, scene_data):
         if (self.facing_left):
@@ -1401,6 +1578,9 @@ class GolemHand(Kinetic):
         if (not facing_left):
             self.set_location(-69, 0)
             self.sprite.flip_horizontally(True)
+        self.mask_sprite = self.sprite
+        self.collision_layer = CollisionLayer.BOSS_HAZARD
+        self.collision_mask = CollisionLayer.PLAYER | CollisionLayer.PLAYER_BULLET | CollisionLayer.TERRAIN
         self.init_y = 0
 
         self.attack_finished = False
@@ -1420,11 +1600,13 @@ class GolemHand(Kinetic):
         self.boss = boss
         self.color = Color.TEAL
 
-        self.velocity = Vector2(0, 0)
+        self.velocity.set(0, 0)
         self.acceleration = Vector2(0, 0)
 
         # Kinetic needs this
         self.query_result = None
+        self.static_query_result = []
+        self.contact_cache = ContactCache(16)
         self.area = Rect(
             self.x - 8,
             self.y - 8,
@@ -1450,15 +1632,19 @@ class GolemHand(Kinetic):
                 self.rest_timer.start()
                 self.charge_timer.reset()
 
+    def can_sleep(self):
+        # Hands keep seeking the player between attacks, even while they happen to be still.
+        return False
+
     def seek(self, delta_time, scene_data):
         centerPlayer = scene_data.actor.x + scene_data.actor.width / 2 + self.seek_ofs
         centerHand = self.x + self.width / 2
         distance = centerPlayer - centerHand
         new_vel = distance * distance / self.seek_accel
         if (distance < 0):
-            self.velocity = Vector2(-new_vel, 0)
+            self.velocity.set(-new_vel, 0)
         elif (centerPlayer - centerHand > 0):
-            self.velocity = Vector2(new_vel, 0)
+            self.velocity.set(new_vel, 0)
 
         if (abs(self.velocity.x) > self.seek_speed):
             self.velocity.x = self.seek_speed if self.velocity.x > 0 else -self.seek_speed
@@ -1466,11 +1652,19 @@ class GolemHand(Kinetic):
     def __rectanlge_collision_logic(self, entity):
         if self.collision_rectangles[1].colliderect(entity.bounds) and self.velocity.y > 0:
             self.set_location(self.x, entity.bounds.top - self.bounds.height)
+            self.contact_cache.separate(entity, Direction.DOWN)
             if (not self.attack_finished):
                 play_sound("smash.wav", 0.3)
             self.attack_finished = True
             
 
+    def take_hit(self, damage):
+        self.boss.hit(damage)
+
+    def is_harmful(self):
+        # A fist that already landed rests on the ground, where it is safe to touch.
+        return not self.attack_finished
+
     def _collision(self, scene_data):
         self._update_collision_rectangles()
 
@@ -1478,41 +1672,17 @@ class GolemHand(Kinetic):
             for e in scene_data.entities:
                 e.set_color(Color.WHITE)
 
-        self.area = Rect(
-            self.x - 16,
-            self.y - 16,
-            self.width + 16 * 2,
-            self.height + 16 * 2
-        )
+        self._update_area(16)
 
-        self.query_result = scene_data.entity_quad_tree.query(self.area)
-
-        for e in self.query_result:
-            if e is self:
-                continue
+        self.static_query_result = self.contact_cache.query(
+            scene_data.static_bvh, self.area, Block)
 
-            if isinstance(e, Block):
-                self.__rectanlge_collision_logic(e)
+        for e in self.static_query_result:
+            self.__rectanlge_collision_logic(e)
 
             if (globals.debugging):
                 e.set_color(Color.RED)
 
-        # Check collision against Kinetic stuff (ugly I know)
-        self.query_result = scene_data.kinetic_quad_tree.query(self.area)
-
-        for e in self.query_result:
-            if e is self:
-                continue
-
-            if isinstance(e, Bullet):
-                if (self.bounds.colliderect(e.bounds)):
-                    self.boss.hit(e.damage)
-                    e.remove = True
-
-            if isinstance(e, Player):
-                if (self.bounds.colliderect(e.bounds) and not self.attack_finished):
-                    e.take_damage()
-
     def update(self, delta_time, scene_data):
         self.attack_timer.update(delta_time)
         self.rest_timer.update(delta_time)
@@ -1586,6 +1756,14 @@ class Golem(Boss):
 
         super(Golem, self).reset()
 
+    def get_parts(self):
+        parts = [self.right_hand, self.left_hand]
+        for p in self.palms:
+            if not p.remove:
+                parts.append(p)
+
+        return parts
+
     def __change_stage(self, scene_data):
         if (self.health < self.total_health * 0.25):
             # final stage: faster smashes, even more palms
@@ -1613,23 +1791,13 @@ class Golem(Boss):
         if self.health < self.next_checkpoint:
             self.__change_stage(scene_data)
 
-    def __collision(self, scene_data):
-        self.query_result = scene_data.kinetic_quad_tree.query(self.area)
-
-        for e in self.query_result:
-            if e is self:
-                continue
-
-            if isinstance(e, Bullet):
-                if (self.bounds.colliderect(e.bounds)):
-                    self.hit(e.damage * 0.6)
-                    e.remove = True
+    def take_hit(self, damage):
+        self.hit(damage * 0.6)
 
     def update(self, delta_time, scene_data):
         if (scene_data.actor == None):
             return
 
-        self.__collision(scene_data)
         self.__update_stage_change(scene_data)
         self.palm_timer.update(delta_time)
         if (self.palm_timer.done):
@@ -1664,3 +1832,20 @@ class Golem(Boss):
             p.draw(surface)
 
         super(Golem, self).draw(surface)
+
+
+def bullet_hits_boss(bullet, target):
+    "Handles a player's bullet against the first thing it struck on the BOSS or BOSS_HAZARD layers, which implement take_hit(damage)."
+    target.take_hit(bullet.damage)
+    bullet.remove = True
+
+
+def projectile_hits_boss(target, damage):
+    "Handles a batched projectile against anything on the BOSS or BOSS_HAZARD layers, which implement take_hit(damage)."
+    target.take_hit(damage)
+
+
+def hazard_hits_player(hazard, player):
+    "Handles anything on the BOSS_HAZARD layer, which implements is_harmful(), against a player."
+    if (not player.remove and hazard.is_harmful() and hazard.bounds.colliderect(player.bounds) and hazard.overlaps_pixels(player)):
+        player.take_damage()
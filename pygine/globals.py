@@ -1,6 +1,15 @@
+import random
+
 # Yeah alright global variables are bad, but give me a break im only using one and it's for debugging purposes!
 debugging = False
+# Deterministic runs use a fixed delta_time, integrate in fixed point, and seed random, so the same input always plays out the same way.
+deterministic = False
 
 def toggle_debugging():
     global debugging
-    debugging = not debugging
\ No newline at end of file
+    debugging = not debugging
+
+def enable_determinism(seed=0):
+    global deterministic
+    deterministic = True
+    random.seed(seed)
@@ -4,6 +4,8 @@ import math
 class Vector2:
     "a poor man's vector class."
 
+    __slots__ = ("x", "y")
+
     def __init__(self, x=0.0, y=0.0):
         self.x = x
         self.y = y
@@ -12,9 +14,28 @@ class Vector2:
     def distance_between(vector_a, vector_b):
         return math.sqrt((vector_a.x - vector_b.x)**2 + (vector_a.y - vector_b.y)**2)
 
+    @staticmethod
+    def distance_squared_between(vector_a, vector_b):
+        "Cheaper than distance_between() when only comparing distances."
+        x = vector_a.x - vector_b.x
+        y = vector_a.y - vector_b.y
+        return x * x + y * y
+
+    def set(self, x, y):
+        "Changes both components in place."
+        self.x = x
+        self.y = y
+
+    def copy(self):
+        return Vector2(self.x, self.y)
+
     def length(self):
         "Returns the length of this vector."
-        return math.sqrt(self.x**2 + self.y**2)
+        return math.sqrt(self.x * self.x + self.y * self.y)
+
+    def length_squared(self):
+        "Cheaper than length() when only comparing lengths."
+        return self.x * self.x + self.y * self.y
 
     def add(self, value):
         if isinstance(value, Vector2):
@@ -23,7 +44,7 @@ class Vector2:
         else:
             self.x += value
             self.y += value
-            
+
     def subtract(self, value):
         if isinstance(value, Vector2):
             self.x -= value.x
@@ -41,27 +62,110 @@ class Vector2:
             self.y *= value
 
     def divide(self, value):
-        if isinstance(value, Vector2): 
+        if isinstance(value, Vector2):
             self.x /= value.x
             self.y /= value.y
         else:
             self.x /= value
             self.y /= value
 
+    def add_scaled(self, vector, scalar):
+        "Adds vector * scalar in place, without building an intermediate vector."
+        self.x += vector.x * scalar
+        self.y += vector.y * scalar
+
     def normalize(self):
         "Converts this vector into a unit vector."
         magnitude = self.length()
         if magnitude > 0:
-            self.divide(magnitude)
+            inverse = 1.0 / magnitude
+            self.x *= inverse
+            self.y *= inverse
 
     def set_magnitude(self, magnitude):
         "Set the length of the vector to magnitude"
-        self.normalize()
-        self.x *= magnitude
-        self.y *= magnitude
+        length = self.length()
+        if length > 0:
+            scale = magnitude / length
+            self.x *= scale
+            self.y *= scale
 
     def limit(self, max_force):
         "Limit the length of the vector to max_force"
-        if self.length() ** 2 > max_force ** 2:
-            self.normalize()
-            self.set_magnitude(max_force)
+        length_squared = self.length_squared()
+        if length_squared > max_force * max_force:
+            scale = max_force / math.sqrt(length_squared)
+            self.x *= scale
+            self.y *= scale
+
+    # Operators. Vectors combine with vectors, and scale by plain numbers.
+
+    def __add__(self, other):
+        return Vector2(self.x + other.x, self.y + other.y)
+
+    def __sub__(self, other):
+        return Vector2(self.x - other.x, self.y - other.y)
+
+    def __mul__(self, scalar):
+        return Vector2(self.x * scalar, self.y * scalar)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        return Vector2(self.x / scalar, self.y / scalar)
+
+    def __neg__(self):
+        return Vector2(-self.x, -self.y)
+
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __imul__(self, scalar):
+        self.x *= scalar
+        self.y *= scalar
+        return self
+
+    def __itruediv__(self, scalar):
+        self.x /= scalar
+        self.y /= scalar
+        return self
+
+    def __repr__(self):
+        return "Vector2({}, {})".format(self.x, self.y)
+
+
+class SubpixelVector2(Vector2):
+    "A Vector2 whose components are stored as whole numbers of 1/SUBPIXELS, so everything written into it lands on the same grid."
+
+    __slots__ = ("subpixel_x", "subpixel_y")
+
+    SUBPIXELS = 256
+
+    @property
+    def x(self):
+        return self.subpixel_x / float(SubpixelVector2.SUBPIXELS)
+
+    @x.setter
+    def x(self, value):
+        self.subpixel_x = int(round(value * SubpixelVector2.SUBPIXELS))
+
+    @property
+    def y(self):
+        return self.subpixel_y / float(SubpixelVector2.SUBPIXELS)
+
+    @y.setter
+    def y(self, value):
+        self.subpixel_y = int(round(value * SubpixelVector2.SUBPIXELS))
+
+    def copy(self):
+        return SubpixelVector2(self.x, self.y)
+
+    def __repr__(self):
+        return "SubpixelVector2({}, {})".format(self.x, self.y)
@@ -0,0 +1,239 @@
+from enum import IntEnum
+from pygame import Rect
+from pygine.maths import SubpixelVector2
+
+
+def time_of_impact(bounds, displacement_x, displacement_y, obstacle):
+    """
+    Sweeps bounds along the displacement, and returns the fraction of it travelled before bounds first overlaps obstacle, or -1 if it never does.
+    Overlap is strict, like Rect.colliderect, so merely touching an edge is not an impact.
+    """
+    enter = 0.0
+    leave = 1.0
+
+    for start, size, displacement, low, high in (
+        (bounds.left, bounds.width, displacement_x,
+         obstacle.left, obstacle.right),
+        (bounds.top, bounds.height, displacement_y,
+         obstacle.top, obstacle.bottom)
+    ):
+        # Along this axis the two overlap while low - size < start + displacement * t < high.
+        if displacement == 0:
+            if start <= low - size or start >= high:
+                return -1
+            continue
+
+        a = (low - size - start) / float(displacement)
+        b = (high - start) / float(displacement)
+        if a > b:
+            a, b = b, a
+        if a > enter:
+            enter = a
+        if b < leave:
+            leave = b
+        if enter >= leave:
+            return -1
+
+    return enter
+
+
+class ContactCache:
+    "Remembers the geometry around a body between steps, and only asks the broadphase again once the body moves beyond a margin."
+
+    def __init__(self, margin):
+        self.margin = margin
+        # The area the cached candidates were gathered from.
+        self.area = Rect(0, 0, 0, 0)
+        self.contacts = []
+        # How each contact was separated from the body during the previous step.
+        self.axes = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.__structure = None
+        self.__version = -1
+        self.__kind = None
+        self.__candidates = []
+        self.__separated = {}
+
+    def query(self, structure, area, kind=None):
+        """
+        Returns everything in the structure that overlaps the area.
+        Contacts that were separated during the previous step come first, in case resolving them already settles the body.
+        """
+        if structure is self.__structure and structure.version == self.__version and kind is self.__kind and self.area.contains(area):
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.area = area.inflate(self.margin * 2, self.margin * 2)
+            self.__candidates = structure.query(
+                self.area, self.__candidates, kind)
+            self.__structure = structure
+            self.__version = structure.version
+            self.__kind = kind
+
+        # What was separated during the previous step becomes the axes to check first, and this step starts recording afresh.
+        self.axes, self.__separated = self.__separated, self.axes
+        self.__separated.clear()
+
+        del self.contacts[:]
+        for e in self.__candidates:
+            if e in self.axes and e.bounds.colliderect(area):
+                self.contacts.append(e)
+        for e in self.__candidates:
+            if e not in self.axes and e.bounds.colliderect(area):
+                self.contacts.append(e)
+
+        return self.contacts
+
+    def separate(self, pygine_object, axis):
+        "Records that the body was pushed out of an object along the given axis during this step."
+        self.__separated[pygine_object] = axis
+
+    def clear(self):
+        self.area = Rect(0, 0, 0, 0)
+        del self.contacts[:]
+        del self.__candidates[:]
+        self.axes.clear()
+        self.__separated.clear()
+        self.__structure = None
+        self.__version = -1
+
+
+class CollisionLayer(IntEnum):
+    "Every entity is on one layer. Masks combine layers with |."
+    NONE = 0
+    PLAYER = 1
+    PLAYER_BULLET = 2
+    BOSS = 4
+    BOSS_HAZARD = 8
+    TERRAIN = 16
+
+
+class CollisionDispatcher:
+    "Filters the pairs a broadphase found by collision layer, and hands each remaining pair to the handler registered for its layers."
+
+    def __init__(self):
+        self.__handlers = {}
+        # How many pairs were handed to a handler, and how many were filtered out, since the dispatcher was created.
+        self.dispatched = 0
+        self.filtered = 0
+
+    def register(self, layer_a, layer_b, handler):
+        "Calls handler(a, b) for every pair of an entity on layer_a and an entity on layer_b whose masks accept each other."
+        self.__handlers[(layer_a, layer_b)] = (handler, False)
+        if layer_a != layer_b:
+            self.__handlers[(layer_b, layer_a)] = (handler, True)
+
+    def dispatch(self, pairs):
+        handlers = self.__handlers
+
+        for a, b in pairs:
+            if not (a.collision_layer & b.collision_mask and b.collision_layer & a.collision_mask):
+                self.filtered += 1
+                continue
+
+            entry = handlers.get((a.collision_layer, b.collision_layer))
+            if entry == None:
+                self.filtered += 1
+                continue
+
+            self.dispatched += 1
+            if entry[1]:
+                entry[0](b, a)
+            else:
+                entry[0](a, b)
+
+
+class SimulationClock:
+    "Advances every Kinetic body of a scene in lockstep, in fixed steps of target seconds."
+
+    MAX_STEPS = 5
+
+    def __init__(self, target=1.0 / 60, max_steps=MAX_STEPS):
+        self.target = target
+        self.accumulator = 0
+        # Catching up after a stall never takes more than this many steps in one frame; the rest of the time is dropped, and the game slows down instead.
+        self.max_steps = max_steps
+        # How much time was dropped during the last advance(), and since the clock was created.
+        self.dropped_time = 0
+        self.total_dropped_time = 0
+        # Bodies that asked to be simulated during the current frame.
+        self.bodies = []
+        # How many steps have been simulated in total.
+        self.steps = 0
+
+    def schedule(self, body):
+        self.bodies.append(body)
+
+    def advance(self, elapsed_time):
+        "Adds elapsed_time to the clock, and returns how many steps are now due."
+        self.accumulator += elapsed_time
+        self.dropped_time = 0
+
+        steps = 0
+        while (self.accumulator >= self.target):
+            if steps == self.max_steps:
+                # Keep the fraction of a step that is left over, so the next frame still lines up.
+                remainder = self.accumulator % self.target
+                self.dropped_time = self.accumulator - remainder
+                self.total_dropped_time += self.dropped_time
+                self.accumulator = remainder
+                break
+
+            self.accumulator -= self.target
+            steps += 1
+        self.steps += steps
+
+        return steps
+
+    def clear(self):
+        del self.bodies[:]
+
+    def reset(self):
+        self.accumulator = 0
+        self.dropped_time = 0
+        self.clear()
+
+
+def _divide(value, divisor):
+    "Integer division that rounds to the nearest integer, and halves away from zero, so both directions round alike."
+    if value < 0:
+        return -((divisor // 2 - value) // divisor)
+
+    return (value + divisor // 2) // divisor
+
+
+class FixedPointIntegrator:
+    """
+    Integrates every scheduled body with the whole sub-pixels a Kinetic body keeps its position and velocity in during deterministic runs, so identical input always produces bit-identical positions.
+    Only accelerations are snapped onto the sub-pixel grid, at the start of each step.
+    """
+
+    SUBPIXELS = SubpixelVector2.SUBPIXELS
+
+    def integrate(self, bodies, delta_time):
+        "Advances every body by delta_time, which has to divide a second into a whole number of steps."
+        scale = FixedPointIntegrator.SUBPIXELS
+        steps_per_second = int(round(1.0 / delta_time))
+
+        for body in bodies:
+            # Positions are in sub-pixels, velocities in sub-pixels per second, and accelerations in sub-pixels per second squared.
+            velocity = body.velocity
+            velocity.subpixel_x += _divide(
+                int(round(body.acceleration.x * scale)), steps_per_second)
+            velocity.subpixel_y += _divide(
+                int(round(body.acceleration.y * scale)), steps_per_second)
+            body.subpixel_x += _divide(velocity.subpixel_x, steps_per_second)
+            body.subpixel_y += _divide(velocity.subpixel_y, steps_per_second)
+
+            body.x = body.subpixel_x / float(scale)
+            body.y = body.subpixel_y / float(scale)
+            # Rect truncates, so this matches what set_location() would have produced.
+            body.bounds.x = int(body.x)
+            body.bounds.y = int(body.y)
+
+    def sync(self, bodies):
+        "Lets every body update whatever else depends on its location, such as its sprites."
+        for body in bodies:
+            body.set_location(body.x, body.y)
@@ -0,0 +1,170 @@
+from pygame import Rect
+from pygine import globals
+from pygine.draw import draw_images, draw_rectangle
+from pygine.utilities import CameraType, Color
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ProjectileManager:
+    """
+    Keeps every projectile of a scene in parallel NumPy arrays, and moves, culls, collides, and draws all of them at once.
+    Projectiles are width by height boxes that fly in a straight line until they travel too far, leave the scene, or hit something.
+    """
+
+    AVAILABLE = numpy != None
+
+    def __init__(self, image, width, height, collision_layer, collision_mask, on_hit, capacity=64):
+        assert (numpy != None), \
+            "The ProjectileManager requires NumPy! Install NumPy, or fire projectiles as Bullet entities instead."
+
+        self.image = image
+        self.width = width
+        self.height = height
+        self.collision_layer = collision_layer
+        self.collision_mask = collision_mask
+        # Called with the target and the damage of every projectile that hits something.
+        self.on_hit = on_hit
+        self.hits = 0
+
+        # Rows below count are in use. Rows that died are compacted away once per frame.
+        self.count = 0
+        self.position = numpy.zeros((capacity, 2))
+        # Where each projectile was when the current step began, so hits are swept across the whole step.
+        self.start = numpy.zeros((capacity, 2))
+        self.velocity = numpy.zeros((capacity, 2))
+        self.origin = numpy.zeros((capacity, 2))
+        self.travel = numpy.zeros(capacity)
+        self.damage = numpy.zeros(capacity)
+        self.alive = numpy.zeros(capacity, dtype=bool)
+
+    def fire(self, x, y, velocity_x, velocity_y, travel, damage):
+        if self.count == len(self.alive):
+            self.__grow()
+
+        i = self.count
+        self.position[i] = (x, y)
+        self.start[i] = (x, y)
+        self.velocity[i] = (velocity_x, velocity_y)
+        self.origin[i] = (x, y)
+        self.travel[i] = travel
+        self.damage[i] = damage
+        self.alive[i] = True
+        self.count += 1
+
+    def integrate(self, delta_time):
+        total = self.count
+        self.start[:total] = self.position[:total]
+        self.position[:total] += self.velocity[:total] * delta_time
+
+    def cull(self, bounds):
+        "Kills every projectile that travelled farther than it may, or left bounds."
+        total = self.count
+        position = self.position[:total]
+        alive = self.alive[:total]
+
+        alive &= (numpy.abs(position - self.origin[:total])
+                  <= self.travel[:total, None]).all(axis=1)
+        alive &= position[:, 0] + self.width >= bounds.left
+        alive &= position[:, 0] <= bounds.right
+        alive &= position[:, 1] + self.height >= bounds.top
+        alive &= position[:, 1] <= bounds.bottom
+
+    def collide(self, targets):
+        """
+        Sweeps every living projectile across the last step against the bounds of each target whose layers it collides with.
+        Overlap is strict, like Rect.colliderect, and a projectile dies on the first target it reaches.
+        """
+        total = self.count
+        if total == 0:
+            return
+
+        alive = self.alive[:total]
+        if not alive.any():
+            return
+
+        # The earliest time of impact of every projectile so far, and the index of the target it belongs to.
+        earliest = numpy.full(total, numpy.inf)
+        struck = numpy.full(total, -1)
+        targets = [
+            target for target in targets
+            if self.collision_layer & target.collision_mask and target.collision_layer & self.collision_mask
+        ]
+
+        for index, target in enumerate(targets):
+            hit = alive.copy()
+            bounds = target.bounds
+            enter = numpy.zeros(total)
+            leave = numpy.ones(total)
+
+            for axis, size, low, high in (
+                (0, self.width, bounds.left, bounds.right),
+                (1, self.height, bounds.top, bounds.bottom)
+            ):
+                # Along this axis the two overlap while low - size < start + displacement * t < high.
+                start = self.start[:total, axis]
+                displacement = self.position[:total, axis] - start
+                moving = displacement != 0
+
+                hit &= moving | ((start > low - size) & (start < high))
+
+                with numpy.errstate(divide="ignore", invalid="ignore"):
+                    a = (low - size - start) / displacement
+                    b = (high - start) / displacement
+                enter = numpy.where(
+                    moving, numpy.maximum(enter, numpy.minimum(a, b)), enter)
+                leave = numpy.where(
+                    moving, numpy.minimum(leave, numpy.maximum(a, b)), leave)
+
+            hit &= (enter < leave) & (enter < earliest)
+            earliest[hit] = enter[hit]
+            struck[hit] = index
+
+        for i in numpy.flatnonzero(struck >= 0).tolist():
+            self.alive[i] = False
+            self.hits += 1
+            self.on_hit(targets[struck[i]], float(self.damage[i]))
+
+    def compact(self):
+        "Moves every living projectile to the front of the arrays, keeping their order."
+        total = self.count
+        living = numpy.flatnonzero(self.alive[:total])
+        remaining = len(living)
+        if remaining == total:
+            return
+
+        for array in (self.position, self.start, self.velocity, self.origin, self.travel, self.damage):
+            array[:remaining] = array[living]
+        self.alive[:remaining] = True
+        self.alive[remaining:total] = False
+        self.count = remaining
+
+    def clear(self):
+        self.alive[:self.count] = False
+        self.count = 0
+
+    def __grow(self):
+        capacity = len(self.alive) * 2
+        for name in ("position", "start", "velocity", "origin", "travel", "damage", "alive"):
+            old = getattr(self, name)
+            new = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def draw(self, surface):
+        locations = self.position[:self.count][self.alive[:self.count]].tolist()
+
+        if globals.debugging:
+            for x, y in locations:
+                draw_rectangle(
+                    surface,
+                    Rect(x, y, self.width, self.height),
+                    CameraType.DYNAMIC,
+                    Color.WHITE
+                )
+        else:
+            draw_images(surface, self.image, self.width,
+                        self.height, locations, CameraType.STATIC)
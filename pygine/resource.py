@@ -16,6 +16,10 @@ BOSS_SPRITES = []
 
 BACKGROUNDS = []
 
+# Collision masks are built once for every frame, of every sheet, in every orientation, and shared by every sprite that shows it.
+SPRITE_MASKS = {}
+SOLID_MASKS = {}
+
 def load_content():
     global SPRITE_SHEET
     global TEXT_SHEET
@@ -33,6 +37,16 @@ def load_content():
     load_sound_paths()
 
 
+def get_solid_mask(width, height):
+    "Returns a fully set mask of the given size, for things that collide as plain rectangles."
+    mask = SOLID_MASKS.get((width, height))
+    if mask == None:
+        mask = pygame.mask.Mask((width, height), True)
+        SOLID_MASKS[(width, height)] = mask
+
+    return mask
+
+
 def __load_layers():
     # Load Extra backgrounds
     path = os.path.dirname(os.path.abspath(__file__)) + \
@@ -126,6 +140,7 @@ class Sprite(PygineObject):
         if flip:
             self.image = pygame.transform.flip(
                 self.image, True, False).convert_alpha()
+            self.flipped_horizontally = not self.flipped_horizontally
         else:
             self.image = pygame.transform.flip(
                 self.image, False, False).convert_alpha()
@@ -134,10 +149,29 @@ class Sprite(PygineObject):
         if flip:
             self.image = pygame.transform.flip(
                 self.image, False, True).convert_alpha()
+            self.flipped_vertically = not self.flipped_vertically
         else:
             self.image = pygame.transform.flip(
                 self.image, False, False).convert_alpha()
 
+    def get_mask(self):
+        "Returns the collision mask of the current frame and orientation, building it the first time it is needed."
+        key = (
+            id(self.sprite_sheet),
+            self.__sprite_x,
+            self.__sprite_y,
+            self.width,
+            self.height,
+            self.flipped_horizontally,
+            self.flipped_vertically
+        )
+        mask = SPRITE_MASKS.get(key)
+        if mask == None:
+            mask = pygame.mask.from_surface(self.image)
+            SPRITE_MASKS[key] = mask
+
+        return mask
+
     def __sprite_setup(self, sprite_x=0, sprite_y=0, width=0, height=0):
         self.__original_sprite_x = sprite_x
         self.__original_sprite_y = sprite_y
@@ -222,6 +256,9 @@ class Sprite(PygineObject):
     def __apply_changes_to_sprite(self):
         self.image = pygame.Surface(
             (self.width, self.height), pygame.SRCALPHA).convert_alpha()
+        # A freshly cut frame is never flipped.
+        self.flipped_horizontally = False
+        self.flipped_vertically = False
 
         self.image.blit(self.sprite_sheet, (0, 0),
                         (self.__sprite_x, self.__sprite_y, self.width, self.height))
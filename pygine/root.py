@@ -1,7 +1,7 @@
 import math
 import os
 import pygame
-from pygine.globals import toggle_debugging
+from pygine.globals import enable_determinism, toggle_debugging
 from pygine.input import get_dynamic_mouse_position, InputType, pressed, update_input
 from pygine.resource import load_content, Text
 from pygine.scenes import *
@@ -23,7 +23,11 @@ class Game:
     "A modest game engine used to streamline the development of a game made using pygame"
     state = GameState.QUIT
 
-    def __init__(self):
+    def __init__(self, deterministic=False, seed=0):
+        # Scenes read this while they are created, so it has to be settled first.
+        if deterministic:
+            enable_determinism(seed)
+
         self.__initialize_pygame()
 
         self.__setup_window(
@@ -140,6 +144,10 @@ class Game:
         self.delta_time = (pygame.time.get_ticks() - self.ticks) / 1000.0
         self.ticks = pygame.time.get_ticks()
 
+        # Every frame counts as exactly one frame, however long it really took.
+        if globals.deterministic:
+            self.delta_time = 1.0 / self.target_fps
+
     def __update_input(self, delta_time):
         update_input()
 
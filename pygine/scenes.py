@@ -4,8 +4,10 @@ from pygame import Rect
 from pygine.entities import *
 from pygine.input import InputType, pressed
 from pygine.maths import Vector2
+from pygine.physics import CollisionDispatcher, CollisionLayer, FixedPointIntegrator, SimulationClock
+from pygine.projectiles import ProjectileManager
 from pygine.sounds import play_song
-from pygine.structures import Quadtree, Bin
+from pygine.structures import BoundingVolumeHierarchy, EntityStore, FlatQuadtree, Bin, IndexType, PartitionTuner, SweepAndPrune, create_spatial_index
 from pygine.transitions import Pinhole, TransitionType
 from pygine.triggers import OnButtonPressTrigger
 from pygine.utilities import Camera, Timer
@@ -143,6 +145,11 @@ class SceneDataRelay(object):
         self.entity_quad_tree = None
         self.entity_bin = None
         self.kinetic_quad_tree = None
+        self.kinetic_sweep = None
+        self.static_bvh = None
+        self.simulation_clock = None
+        self.bullet_pool = None
+        self.projectiles = None
         self.actor = None
 
         self.entity_buffer = []
@@ -150,16 +157,23 @@ class SceneDataRelay(object):
     def set_scene_bounds(self, bounds):
         self.scene_bounds = bounds
 
-    def update(self, entites, entity_quad_tree, entity_bin, kinetic_quad_tree, actor):
+    def update(self, entites, entity_quad_tree, entity_bin, kinetic_quad_tree, kinetic_sweep, static_bvh, simulation_clock, actor):
         self.entities = entites
         self.entity_quad_tree = entity_quad_tree
         self.entity_bin = entity_bin
         self.kinetic_quad_tree = kinetic_quad_tree
+        self.kinetic_sweep = kinetic_sweep
+        self.static_bvh = static_bvh
+        self.simulation_clock = simulation_clock
         self.actor = actor
 
 
 class Scene(object):
     VIEWPORT_BUFFER = 32
+    # Bodies closer than twice this distance are reported as potentially colliding.
+    SWEEP_PADDING = 8
+    # Scenes that index everything in a grid use cells of 2^GRID_CELL_POWER pixels.
+    GRID_CELL_POWER = 5
 
     def __init__(self):
         self.scene_bounds = Rect(
@@ -180,20 +194,48 @@ class Scene(object):
             2
         )
 
-        self.entities = []
+        self.entities = EntityStore()
         self.sprites = []
         self.shapes = []
         self.triggers = []
 
-        self.sprite_quad_tree = Quadtree(self.scene_bounds, 4)
-        self.shape_quad_tree = Quadtree(self.scene_bounds, 4)
-        self.entity_quad_tree = Quadtree(self.scene_bounds, 4)
-        self.kinetic_quad_tree = Quadtree(self.scene_bounds, 4)
-        self.entity_bin = Bin(self.scene_bounds, 4)
+        self.sprite_quad_tree = FlatQuadtree(self.scene_bounds, 4)
+        self.shape_quad_tree = FlatQuadtree(self.scene_bounds, 4)
+        self.entity_quad_tree = FlatQuadtree(self.scene_bounds, 4)
+        self.kinetic_quad_tree = FlatQuadtree(self.scene_bounds, 4)
+        self.entity_bin = None
+        self.kinetic_bin = None
+        self.kinetic_sweep = SweepAndPrune(Scene.SWEEP_PADDING)
+        self.sweep_participants = []
+        self.swept_bounds = {}
+        self.active_count = 0
+        self.sleeping_count = 0
+        self.static_bvh = BoundingVolumeHierarchy(Block)
+        self.simulation_clock = SimulationClock()
+        self.integrator = None
+        self.bullet_pool = BulletPool()
+        self.projectiles = None
+        # Every pair the sweep finds during a step is dispatched here, once, instead of each body visiting its own candidates.
+        self.collision_dispatcher = CollisionDispatcher()
+        self.collision_dispatcher.register(
+            CollisionLayer.PLAYER_BULLET, CollisionLayer.BOSS, self.__record_bullet_impact)
+        self.collision_dispatcher.register(
+            CollisionLayer.PLAYER_BULLET, CollisionLayer.BOSS_HAZARD, self.__record_bullet_impact)
+        # The earliest (time of impact, target) of every bullet that struck something during the current step.
+        self.bullet_impacts = {}
+        self.collision_dispatcher.register(
+            CollisionLayer.BOSS_HAZARD, CollisionLayer.PLAYER, hazard_hits_player)
         self.query_result = None
         self.first_pass = True
         self.entities_are_uniform = False
         self.optimal_bin_size = 0
+        self.kinetics_use_bin = False
+        self.optimal_kinetic_bin_size = 0
+        self.kinetic_capacity = 4
+        self.kinetic_max_depth = 8
+        self.auto_tune = False
+        self.partition_tuner = None
+        self.index_type = IndexType.QUADTREE
 
         self.leave_transition_type = TransitionType.PINHOLE_CLOSE
         self.enter_transition_type = TransitionType.PINHOLE_OPEN
@@ -202,13 +244,51 @@ class Scene(object):
 
         self.scene_data = SceneDataRelay()
         self.scene_data.set_scene_bounds(self.scene_bounds)
+        self.scene_data.bullet_pool = self.bullet_pool
 
-    def setup(self, entities_are_uniform, maximum_entity_dimension=0):
+    def setup(self, entities_are_uniform, maximum_entity_dimension=0, kinetics_use_bin=False, maximum_kinetic_dimension=0, auto_tune=False, index_type=IndexType.QUADTREE, max_steps_per_frame=SimulationClock.MAX_STEPS, batched_projectiles=False):
         self.entities_are_uniform = entities_are_uniform
         if self.entities_are_uniform:
             self.optimal_bin_size = int(
                 math.ceil(math.log(maximum_entity_dimension, 2)))
 
+        # Bullet heavy scenes can track Kinetic entities in a uniform grid instead of a quadtree.
+        self.kinetics_use_bin = kinetics_use_bin
+        if self.kinetics_use_bin:
+            self.optimal_kinetic_bin_size = int(
+                math.ceil(math.log(maximum_kinetic_dimension, 2)))
+        self.kinetic_capacity = 4
+        self.kinetic_max_depth = 8
+
+        # The kinetic partition can instead be picked, and repicked, from what the scene actually contains.
+        # Tuning times the partitions with the wall clock, so deterministic runs never tune.
+        self.auto_tune = auto_tune and not globals.deterministic
+
+        # Which SpatialIndex implementation the scene uses for its sprites, shapes, and entities.
+        self.index_type = index_type
+
+        # Deterministic runs integrate every body in fixed point. Otherwise every body integrates itself.
+        if globals.deterministic:
+            self.integrator = FixedPointIntegrator()
+        else:
+            self.integrator = None
+
+        # Bounds how much catching up the scene does after a stall.
+        self.simulation_clock.max_steps = max_steps_per_frame
+
+        # Bullet heavy scenes can keep their bullets in NumPy arrays instead of entities. Deterministic runs keep fixed point Bullets.
+        if batched_projectiles and not globals.deterministic:
+            self.projectiles = ProjectileManager(
+                Sprite(0, 0, SpriteType.BULLET).image,
+                16, 16,
+                CollisionLayer.PLAYER_BULLET,
+                CollisionLayer.BOSS | CollisionLayer.BOSS_HAZARD,
+                projectile_hits_boss
+            )
+        else:
+            self.projectiles = None
+        self.scene_data.projectiles = self.projectiles
+
         self._reset()
         self._create_triggers()
 
@@ -224,12 +304,20 @@ class Scene(object):
             self.scene_bounds.height + buffer * 2,
         )
 
-        self.sprite_quad_tree = Quadtree(modified_bounds, 4)
-        self.shape_quad_tree = Quadtree(modified_bounds, 4)
-        self.entity_quad_tree = Quadtree(modified_bounds, 4)
-        self.kinetic_quad_tree = Quadtree(self.scene_bounds, 4)
+        self.sprite_quad_tree = create_spatial_index(
+            self.index_type, modified_bounds, power_of_two=Scene.GRID_CELL_POWER)
+        self.shape_quad_tree = create_spatial_index(
+            self.index_type, modified_bounds, power_of_two=Scene.GRID_CELL_POWER)
+        self.entity_quad_tree = create_spatial_index(
+            self.index_type, modified_bounds, power_of_two=Scene.GRID_CELL_POWER)
         if self.entities_are_uniform:
             self.entity_bin = Bin(modified_bounds, self.optimal_bin_size)
+        if self.auto_tune:
+            self.partition_tuner = PartitionTuner(self.scene_bounds)
+            self.__apply_partition_parameters()
+        self.__create_kinetic_partition()
+        self.kinetic_sweep = SweepAndPrune(Scene.SWEEP_PADDING)
+        self.static_bvh = BoundingVolumeHierarchy(Block)
         self.first_pass = True
 
     def relay_actor(self, actor):
@@ -238,9 +326,69 @@ class Scene(object):
             self.entities.append(self.actor)
 
     def relay_entity(self, entity):
-        self.entities.append(entity)
+        "Adds an entity to the scene, and returns a handle that finds it through entities.get() until it is removed."
+        handle = self.entities.append(entity)
+        if not isinstance(entity, Kinetic):
+            self.first_pass = True
         # We can potentially add aditional logic for certain entites. For example, if the entity is a NPC then spawn it at (x, y)
 
+        return handle
+
+    def remove_entity(self, entity):
+        self.entities.remove(entity)
+        self._on_entity_removed(entity)
+
+    def of_type(self, entity_type):
+        "Returns every entity in the scene that is an instance of entity_type, without scanning the others."
+        return self.entities.of_type(entity_type)
+
+    def _on_entity_removed(self, entity):
+        if isinstance(entity, Kinetic):
+            self.__kinetic_partition().remove(entity)
+            if isinstance(entity, Bullet):
+                self.bullet_pool.release(entity)
+        else:
+            # Static geometry changed, so everything built on the first pass is out of date.
+            self.first_pass = True
+
+    def _clear_entities(self):
+        "Empties the scene, and hands every bullet it held back to the pool."
+        for bullet in self.of_type(Bullet):
+            self.bullet_pool.release(bullet)
+        self.entities = EntityStore()
+
+        if self.projectiles != None:
+            self.projectiles.clear()
+
+    def __record_bullet_impact(self, bullet, target):
+        # Pairs are found once per step, so skip anything that was removed since.
+        if bullet.remove:
+            return
+
+        time = bullet.time_of_impact(target.bounds)
+        if time < 0:
+            return
+
+        # A fast bullet can sweep across several targets in one step, but only the one it reaches first is hit.
+        impact = self.bullet_impacts.get(bullet)
+        if impact == None or time < impact[0]:
+            self.bullet_impacts[bullet] = (time, target)
+
+    def __resolve_bullet_impacts(self):
+        for bullet, (time, target) in self.bullet_impacts.items():
+            bullet_hits_boss(bullet, target)
+        self.bullet_impacts.clear()
+
+    def __kinetic_partition(self):
+        return self.kinetic_bin if self.kinetics_use_bin else self.kinetic_quad_tree
+
+    def __queried_kinetic_partition(self):
+        # Queries count towards the cost of the partition as much as keeping it up to date does, so the tuner times every one of them.
+        if self.auto_tune:
+            return self.partition_tuner.measure(self.__kinetic_partition())
+
+        return self.__kinetic_partition()
+
     def _reset(self):
         raise NotImplementedError(
             "A class that inherits Scene did not implement the reset() method")
@@ -261,24 +409,158 @@ class Scene(object):
             self.first_pass = False
 
             self.entity_quad_tree.clear()
-            if self.entities_are_uniform:
-                self.entity_bin.clear()
             for i in range(len(self.entities)):
                 if not isinstance(self.entities[i], Kinetic):
                     self.entity_quad_tree.insert(self.entities[i])
-                    if self.entities_are_uniform:
-                        self.entity_bin.insert(self.entities[i])
+            if self.entities_are_uniform:
+                self.entity_bin.clear()
+                self.entity_bin.insert_many(
+                    [e for e in self.entities if not isinstance(e, Kinetic)])
+
+            self.static_bvh.build(
+                [e for e in self.entities if not isinstance(e, Kinetic)])
+
+        if self.auto_tune:
+            self.partition_tuner.start_measurement()
+
+        if self.kinetics_use_bin:
+            # Rebuilding the grid is vectorized, so it is cheaper to reinsert everything at once.
+            self.kinetic_bin.clear()
+            self.kinetic_bin.insert_many(list(self.of_type(Kinetic)))
+        else:
+            # Kinetic entities stay in the tree between frames and are only relocated when they leave their node.
+            for e in self.of_type(Kinetic):
+                self.kinetic_quad_tree.move(e)
+
+        if self.auto_tune:
+            self.partition_tuner.stop_measurement()
+            self.__tune_kinetic_partition()
+
+        # Boss parts are not part of the scene, but they still collide with everything Kinetic.
+        del self.sweep_participants[:]
+        self.sweep_participants.extend(self.of_type(Kinetic))
+        for e in self.of_type(Boss):
+            self.sweep_participants.append(e)
+            self.sweep_participants.extend(e.get_parts())
+
+    def __create_kinetic_partition(self):
+        self.kinetic_quad_tree = create_spatial_index(
+            self.index_type,
+            self.scene_bounds,
+            self.kinetic_capacity,
+            self.kinetic_max_depth,
+            Scene.GRID_CELL_POWER
+        )
+        if self.kinetics_use_bin:
+            self.kinetic_bin = Bin(
+                self.scene_bounds, self.optimal_kinetic_bin_size)
+
+    def __apply_partition_parameters(self):
+        self.kinetics_use_bin = self.partition_tuner.index_type == IndexType.GRID
+        self.optimal_kinetic_bin_size = self.partition_tuner.power_of_two
+        self.kinetic_capacity = self.partition_tuner.capacity
+        self.kinetic_max_depth = self.partition_tuner.max_depth
+
+    def __tune_kinetic_partition(self):
+        kinetics = list(self.of_type(Kinetic))
+        self.partition_tuner.sample(kinetics)
+        if not self.partition_tuner.tune():
+            return
+
+        self.__apply_partition_parameters()
+        self.__create_kinetic_partition()
+        if self.kinetics_use_bin:
+            self.kinetic_bin.insert_many(kinetics)
+        else:
+            for e in kinetics:
+                self.kinetic_quad_tree.insert(e)
+
+    def __simulate(self, steps):
+        bodies = self.simulation_clock.bodies
+
+        for _ in range(steps):
+            for body in bodies:
+                if body.fast:
+                    body.begin_sweep()
+
+            if self.integrator != None:
+                self.integrator.integrate(
+                    bodies, self.simulation_clock.target)
+            else:
+                for body in bodies:
+                    body._apply_force(self.simulation_clock.target)
+
+            if self.projectiles != None:
+                self.projectiles.integrate(self.simulation_clock.target)
 
-        self.kinetic_quad_tree.clear()
-        for i in range(len(self.entities)):
-            if isinstance(self.entities[i], Kinetic):
-                self.kinetic_quad_tree.insert(self.entities[i])
+            self.swept_bounds.clear()
+            for body in bodies:
+                if body.fast:
+                    body.end_sweep()
+                    self.swept_bounds[body] = body.swept_bounds
+
+            # Everything has moved, so a single broadphase serves every body during this step.
+            self.kinetic_sweep.update(
+                self.sweep_participants, self.swept_bounds)
+            self.__wake_touched_bodies()
+
+            for body in bodies:
+                body._collision(self.scene_data)
+
+            # Bodies have settled against the terrain, so the pairs between them can be resolved.
+            self.collision_dispatcher.dispatch(self.kinetic_sweep.pairs)
+            self.__resolve_bullet_impacts()
+
+            if self.projectiles != None:
+                self.projectiles.collide(self.sweep_participants)
+                self.projectiles.cull(self.scene_bounds)
+
+        if self.integrator != None and steps > 0:
+            self.integrator.sync(bodies)
+
+        if self.projectiles != None:
+            self.projectiles.compact()
+
+        for body in bodies:
+            if body.can_sleep():
+                body.sleep()
+
+        self.simulation_clock.clear()
+
+    def __wake_touched_bodies(self):
+        # A sleeping body that something moving ran into has to respond from the next frame on.
+        for a, b in self.kinetic_sweep.pairs:
+            if a.sleeping and not b.sleeping and isinstance(b, Kinetic):
+                a.wake()
+            elif b.sleeping and not a.sleeping and isinstance(a, Kinetic):
+                b.wake()
 
     def __update_entities(self, delta_time):
-        for i in range(len(self.entities)-1, -1, -1):
-            self.entities[i].update(delta_time, self.scene_data)
-            if self.entities[i].remove:
-                del self.entities[i]
+        steps = self.simulation_clock.advance(delta_time)
+        # Time the clock had to drop is dropped for every entity, so the whole scene slows down together.
+        delta_time -= self.simulation_clock.dropped_time
+
+        self.active_count = 0
+        self.sleeping_count = 0
+        for e in reversed(self.entities):
+            if e.sleeping:
+                self.sleeping_count += 1
+                continue
+            self.active_count += 1
+            e.update(delta_time, self.scene_data)
+
+        # Boss parts are updated by their boss, but they sleep all the same.
+        for e in self.of_type(Boss):
+            for part in e.get_parts():
+                if part.sleeping:
+                    self.sleeping_count += 1
+                else:
+                    self.active_count += 1
+
+        self.__simulate(steps)
+
+        # Everything flagged during the frame is dropped in one pass.
+        self.entities.remove_flagged(self._on_entity_removed)
 
         if (len(self.scene_data.entity_buffer) > 0):
             for i in range(len(self.scene_data.entity_buffer)-1, -1, -1):
@@ -291,26 +573,31 @@ class Scene(object):
 
     def __update_camera(self):
         if self.actor != None:
-            self.camera_location = Vector2(
+            self.camera_location.set(
                 self.actor.x + self.actor.width / 2 - self.camera.BOUNDS.width / 2,
                 self.actor.y + self.actor.height / 2 - self.camera.BOUNDS.height / 2
             )
 
         self.camera.update(self.camera_location, self.scene_bounds)
+        viewport_top_left = self.camera.get_viewport_top_left()
         self.camera_viewport.set_location(
-            self.camera.get_viewport_top_left().x - Scene.VIEWPORT_BUFFER,
-            self.camera.get_viewport_top_left().y - Scene.VIEWPORT_BUFFER)
+            viewport_top_left.x - Scene.VIEWPORT_BUFFER,
+            viewport_top_left.y - Scene.VIEWPORT_BUFFER)
 
     def load_scene(self):
         pass
 
     def update(self, delta_time):
         self.__update_spatial_partitioning()
+
         self.scene_data.update(
             self.entities,
             self.entity_quad_tree,
             self.entity_bin,
-            self.kinetic_quad_tree,
+            self.__queried_kinetic_partition(),
+            self.kinetic_sweep,
+            self.static_bvh,
+            self.simulation_clock,
             self.actor
         )
         self.__update_entities(delta_time)
@@ -319,27 +606,30 @@ class Scene(object):
 
     def draw(self, surface):
         self.query_result = self.shape_quad_tree.query(
-            self.camera_viewport.bounds)
+            self.camera_viewport.bounds, self.query_result)
         for s in self.query_result:
             s.draw(surface, CameraType.DYNAMIC)
 
         self.query_result = self.sprite_quad_tree.query(
-            self.camera_viewport.bounds)
+            self.camera_viewport.bounds, self.query_result)
         for s in self.query_result:
             s.draw(surface, CameraType.DYNAMIC)
 
         self.query_result = self.entity_quad_tree.query(
-            self.camera_viewport.bounds)
+            self.camera_viewport.bounds, self.query_result)
 
         for e in self.query_result:
             e.draw(surface)
 
-        self.query_result = self.kinetic_quad_tree.query(
-            self.camera_viewport.bounds)
+        # The actor is drawn last, on top of everything else.
+        self.query_result = self.__queried_kinetic_partition().query(
+            self.camera_viewport.bounds, self.query_result, exclude=self.actor)
 
         for e in self.query_result:
-            if not isinstance(e, Actor):
-                e.draw(surface)
+            e.draw(surface)
+
+        if self.projectiles != None:
+            self.projectiles.draw(surface)
 
         if self.actor != None:
             self.actor.draw(surface)
@@ -359,7 +649,7 @@ class Menu(Scene):
         self.set_scene_bounds(
             Rect(0, 0, Camera.BOUNDS.width, Camera.BOUNDS.height))
 
-        self.entities = []
+        self._clear_entities()
 
         self.sprites = [
             Sprite(0, 0, SpriteType.TITLE)
@@ -403,7 +693,7 @@ class Select(Scene):
         self.set_scene_bounds(
             Rect(0, 0, Camera.BOUNDS.width, Camera.BOUNDS.height))
 
-        self.entities = []
+        self._clear_entities()
         self.sprites = [
             Sprite(0, 0, SpriteType.SELECT)
         ]
@@ -464,7 +754,7 @@ class Lore(Scene):
         self.set_scene_bounds(
             Rect(0, 0, Camera.BOUNDS.width, Camera.BOUNDS.height))
 
-        self.entities = []
+        self._clear_entities()
         self.sprites = [
             Sprite(0, 0, SpriteType.LORE)
         ]
@@ -487,7 +777,7 @@ class Lore(Scene):
             next_scene.relay_actor(self.entities[0])
             self.manager.queue_next_scene(SceneType.BOSSA)
 
-            del self.entities[0]
+            self.remove_entity(self.entities[0])
 
         super(Lore, self).update(delta_time)
 
@@ -498,7 +788,9 @@ class Lore(Scene):
 class BossBattle(Scene):
     def __init__(self):
         super(BossBattle, self).__init__()
-        self.setup(False)
+        # Batched projectiles leave next to nothing in the kinetic partition, so it is only worth tuning while bullets are entities.
+        self.setup(False, auto_tune=not ProjectileManager.AVAILABLE,
+                   batched_projectiles=ProjectileManager.AVAILABLE)
 
         self.background = Sprite(0, 0, SpriteType.BACKGROUND_0)
 
@@ -516,7 +808,7 @@ class BossBattle(Scene):
     def _reset(self):
         self.set_scene_bounds(
             Rect(0, 0, Camera.BOUNDS.width, Camera.BOUNDS.height))
-        self.entities = []
+        self._clear_entities()
         self.sprites = []
         self.shapes = []
 
@@ -567,12 +859,11 @@ class BossBattle(Scene):
             self._soft_reset()
 
         total = 0
-        for e in self.entities:
-            if isinstance(e, Player):
-                total += 1
-                if (total >= 2):
-                    e.remove = True
-                    break
+        for e in self.of_type(Player):
+            total += 1
+            if (total >= 2):
+                e.remove = True
+                break
 
         super(BossBattle, self).update(delta_time)
 
@@ -620,7 +911,7 @@ class BossA(BossBattle):
         if (self.octopus.dead and not self.complete):
             self.manager.queue_next_scene(SceneType.BOSSB)
 
-            self.entities.remove(self.actor)
+            self.remove_entity(self.actor)
 
             self.manager.move_actor_to_next_scene(self.actor)
 
@@ -670,7 +961,7 @@ class BossB(BossBattle):
         if (self.golem.dead and not self.complete):
             self.manager.queue_next_scene(SceneType.MENU)
 
-            self.entities.remove(self.actor)
+            self.remove_entity(self.actor)
             self.actor = None
             self.complete = True
 
@@ -1,17 +1,154 @@
 import math
+import time
+from enum import IntEnum
 from pygame import Rect
 from pygine.draw import draw_rectangle
 from pygine.utilities import CameraType, Color
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-class Quadtree:
-    def __init__(self, boundary, capacity):
+
+class Ray:
+    "A ray that starts at (x, y) and travels distance pixels along a direction."
+
+    def __init__(self, x, y, direction_x, direction_y, distance=float("inf")):
+        self.set(x, y, direction_x, direction_y, distance)
+
+    def set(self, x, y, direction_x, direction_y, distance=float("inf")):
+        "Points an existing ray somewhere else, so casting many rays does not allocate one each."
+        length = math.sqrt(direction_x * direction_x + direction_y * direction_y)
+        assert (length > 0), \
+            "A Ray needs a direction! Make sure direction_x and direction_y are not both zero."
+
+        self.x = x
+        self.y = y
+        self.direction_x = direction_x / length
+        self.direction_y = direction_y / length
+        self.distance = distance
+
+        # Precomputed for the slab test. None means the ray is parallel to that axis.
+        self.inverse_x = 1.0 / self.direction_x if self.direction_x != 0 else None
+        self.inverse_y = 1.0 / self.direction_y if self.direction_y != 0 else None
+
+    @staticmethod
+    def from_segment(x1, y1, x2, y2):
+        return Ray(x1, y1, x2 - x1, y2 - y1, math.sqrt((x2 - x1)**2 + (y2 - y1)**2))
+
+    def intersects(self, rect):
+        "A slab test. Returns how far along the ray it enters rect, or -1 if it misses rect within its distance."
+        near = 0
+        far = self.distance
+
+        if self.inverse_x == None:
+            if self.x < rect.left or self.x > rect.right:
+                return -1
+        else:
+            a = (rect.left - self.x) * self.inverse_x
+            b = (rect.right - self.x) * self.inverse_x
+            if a > b:
+                a, b = b, a
+            if a > near:
+                near = a
+            if b < far:
+                far = b
+            if near > far:
+                return -1
+
+        if self.inverse_y == None:
+            if self.y < rect.top or self.y > rect.bottom:
+                return -1
+        else:
+            a = (rect.top - self.y) * self.inverse_y
+            b = (rect.bottom - self.y) * self.inverse_y
+            if a > b:
+                a, b = b, a
+            if a > near:
+                near = a
+            if b < far:
+                far = b
+            if near > far:
+                return -1
+
+        return near
+
+
+def _record_hit(hits, distance, pygine_object, first):
+    # When only the first hit matters, hits holds a single (distance, object) pair.
+    if not first or len(hits) == 0:
+        hits.append((distance, pygine_object))
+    elif distance < hits[0][0]:
+        hits[0] = (distance, pygine_object)
+
+
+def _sorted_hits(hits):
+    hits.sort(key=lambda hit: hit[0])
+    return hits
+
+
+def _matches(pygine_object, kind, exclude):
+    "kind can be a type, or a tuple of types."
+    if pygine_object is exclude:
+        return False
+    if kind == None:
+        return True
+
+    return isinstance(pygine_object, kind)
+
+
+class SpatialIndex:
+    "The operations every dynamic spatial index supports, so a scene can swap one implementation for another."
+
+    def insert(self, pygine_object):
+        raise NotImplementedError(
+            "A class that inherits SpatialIndex did not implement the insert(pygine_object) method")
+
+    def remove(self, pygine_object):
+        raise NotImplementedError(
+            "A class that inherits SpatialIndex did not implement the remove(pygine_object) method")
+
+    def move(self, pygine_object):
+        raise NotImplementedError(
+            "A class that inherits SpatialIndex did not implement the move(pygine_object) method")
+
+    def query(self, area, result=None, kind=None, exclude=None):
+        raise NotImplementedError(
+            "A class that inherits SpatialIndex did not implement the query(area, result, kind, exclude) method")
+
+    def query_ray(self, ray):
+        raise NotImplementedError(
+            "A class that inherits SpatialIndex did not implement the query_ray(ray) method")
+
+    def query_ray_first(self, ray):
+        "Returns a (distance, object) pair for the closest thing the ray hits, or None."
+        hits = self.query_ray(ray)
+
+        return hits[0] if len(hits) > 0 else None
+
+    def clear(self):
+        raise NotImplementedError(
+            "A class that inherits SpatialIndex did not implement the clear() method")
+
+    def draw(self, surface):
+        pass
+
+
+class Quadtree(SpatialIndex):
+    def __init__(self, boundary, capacity, max_depth=8):
         self.boundary = boundary
         self.capacity = capacity
+        self.max_depth = max_depth
+        self.depth = 0
+        self.parent = None
 
         self.divided = False
-        self.insertion_index = 0
-        self.objects = [None] * self.capacity
+        self.objects = []
+        # Every node shares the root's lookup table, so move() and remove() can find an object's node without searching.
+        self.locations = {}
+        # Incremented whenever an object is added, removed, or relocated to another node; not when it moves within its node.
+        self.version = 0
 
         self.topLeft = None
         self.topRight = None
@@ -19,49 +156,106 @@ class Quadtree:
         self.bottomLeft = None
 
     def insert(self, pygine_object):
+        if pygine_object in self.locations:
+            return self.move(pygine_object)
+
         if not pygine_object.bounds.colliderect(self.boundary):
             return False
 
-        if self.insertion_index < self.capacity:
-            self.objects[self.insertion_index] = pygine_object
-            self.insertion_index += 1
+        self.__insert(pygine_object)
+        self.version += 1
+
+        return True
+
+    def remove(self, pygine_object):
+        node = self.locations.pop(pygine_object, None)
+        if node == None:
+            return False
+
+        node.objects.remove(pygine_object)
+        node.__collapse()
+        self.version += 1
+
+        return True
+
+    def move(self, pygine_object):
+        "Updates the position of an object whose bounds changed. The object is only relocated if it left its node."
+        node = self.locations.get(pygine_object)
+        if node == None:
+            return self.insert(pygine_object)
+
+        if node.__keeps(pygine_object.bounds):
             return True
+
+        node.objects.remove(pygine_object)
+        del self.locations[pygine_object]
+        self.version += 1
+        moved = self.insert(pygine_object)
+        # The object goes back in before its old node is collapsed, so a branch it stays inside is not merged only to be split again.
+        node.__collapse()
+
+        return moved
+
+    def query(self, area, result=None, kind=None, exclude=None):
+        "Returns every object that intersects area, optionally only those matching kind and never exclude."
+        if result == None:
+            result = []
         else:
-            if not self.divided:
-                self.__subdivide()
+            del result[:]
 
-            if (
-                self.topLeft.insert(pygine_object) or
-                self.topRight.insert(pygine_object) or
-                self.bottomRight.insert(pygine_object) or
-                self.bottomLeft.insert(pygine_object)
-            ):
-                return True
+        self.__query(area, result, kind, exclude)
 
-        return False
+        return result
 
-    def query(self, area):    
+    def __query(self, area, result, kind, exclude):
         if not area.colliderect(self.boundary):
-            return []
-
-        result = []
+            return
 
+        filtered = kind != None or exclude != None
         for i in range(len(self.objects)):
-            if self.objects[i] == None:
-                continue
-
-            if area.colliderect(self.objects[i].bounds):
+            if (
+                area.colliderect(self.objects[i].bounds) and
+                (not filtered or _matches(self.objects[i], kind, exclude))
+            ):
                 result.append(self.objects[i])
 
         if not self.divided:
-            return result
+            return
 
-        result.extend(self.topLeft.query(area))
-        result.extend(self.topRight.query(area))
-        result.extend(self.bottomRight.query(area))
-        result.extend(self.bottomLeft.query(area))
+        self.topLeft.__query(area, result, kind, exclude)
+        self.topRight.__query(area, result, kind, exclude)
+        self.bottomRight.__query(area, result, kind, exclude)
+        self.bottomLeft.__query(area, result, kind, exclude)
 
-        return result
+    def query_ray(self, ray):
+        "Returns a (distance, object) pair for everything the ray hits, closest first."
+        hits = []
+        self.__cast(ray, hits, False)
+
+        return _sorted_hits(hits)
+
+    def query_ray_first(self, ray):
+        "Returns a (distance, object) pair for the closest thing the ray hits, or None."
+        hits = []
+        self.__cast(ray, hits, True)
+
+        return hits[0] if len(hits) > 0 else None
+
+    def __cast(self, ray, hits, first):
+        entry = ray.intersects(self.boundary)
+        if entry < 0 or (first and len(hits) > 0 and entry > hits[0][0]):
+            return
+
+        for pygine_object in self.objects:
+            distance = ray.intersects(pygine_object.bounds)
+            if distance >= 0:
+                _record_hit(hits, distance, pygine_object, first)
+
+        if self.divided:
+            self.topLeft.__cast(ray, hits, first)
+            self.topRight.__cast(ray, hits, first)
+            self.bottomRight.__cast(ray, hits, first)
+            self.bottomLeft.__cast(ray, hits, first)
 
     def clear(self):
         if self.divided:
@@ -76,47 +270,108 @@ class Quadtree:
             self.bottomLeft = None
 
         self.divided = False
-        self.insertion_index = 0
-        self.objects = [None] * self.capacity
+        del self.objects[:]
+        self.locations.clear()
+        self.version += 1
 
-    def __subdivide(self):
-        self.divided = True
-        self.topLeft = Quadtree(
+    def __insert(self, pygine_object):
+        # Objects are stored in the deepest node that completely contains them.
+        if self.divided:
+            child = self.__child_containing(pygine_object.bounds)
+            if child != None:
+                child.__insert(pygine_object)
+                return
+
+        self.objects.append(pygine_object)
+        self.locations[pygine_object] = self
+
+        if (
+            not self.divided and
+            len(self.objects) > self.capacity and
+            self.depth < self.max_depth
+        ):
+            self.__subdivide()
+
+    def __collapse(self):
+        # Children that are all empty leaves are merged back into their parent, all the way up the tree.
+        node = self if self.divided else self.parent
+        while node != None and node.__has_empty_children():
+            node.topLeft = None
+            node.topRight = None
+            node.bottomRight = None
+            node.bottomLeft = None
+            node.divided = False
+            node = node.parent
+
+    def __has_empty_children(self):
+        for child in (self.topLeft, self.topRight, self.bottomRight, self.bottomLeft):
+            if child.divided or len(child.objects) > 0:
+                return False
+
+        return True
+
+    def __keeps(self, bounds):
+        if self.depth == 0:
+            if not bounds.colliderect(self.boundary):
+                return False
+        elif not self.boundary.contains(bounds):
+            return False
+
+        return not self.divided or self.__child_containing(bounds) == None
+
+    def __child_containing(self, bounds):
+        if self.topLeft.boundary.contains(bounds):
+            return self.topLeft
+        if self.topRight.boundary.contains(bounds):
+            return self.topRight
+        if self.bottomRight.boundary.contains(bounds):
+            return self.bottomRight
+        if self.bottomLeft.boundary.contains(bounds):
+            return self.bottomLeft
+
+        return None
+
+    def __create_child(self, x, y):
+        child = Quadtree(
             Rect(
-                self.boundary.x,
-                self.boundary.y,
+                x,
+                y,
                 self.boundary.width / 2,
                 self.boundary.height / 2
             ),
-            self.capacity
+            self.capacity,
+            self.max_depth
         )
-        self.topRight = Quadtree(
-            Rect(
-                self.boundary.x + self.boundary.width / 2,
-                self.boundary.y,
-                self.boundary.width / 2,
-                self.boundary.height / 2
-            ),
-            self.capacity
+        child.depth = self.depth + 1
+        child.parent = self
+        child.locations = self.locations
+
+        return child
+
+    def __subdivide(self):
+        self.divided = True
+        self.topLeft = self.__create_child(
+            self.boundary.x,
+            self.boundary.y
         )
-        self.bottomRight = Quadtree(
-            Rect(
-                self.boundary.x + self.boundary.width / 2,
-                self.boundary.y + self.boundary.height / 2,
-                self.boundary.width / 2,
-                self.boundary.height / 2
-            ),
-            self.capacity
+        self.topRight = self.__create_child(
+            self.boundary.x + self.boundary.width / 2,
+            self.boundary.y
         )
-        self.bottomLeft = Quadtree(
-            Rect(
-                self.boundary.x,
-                self.boundary.y + self.boundary.height / 2,
-                self.boundary.width / 2,
-                self.boundary.height / 2
-            ),
-            self.capacity
+        self.bottomRight = self.__create_child(
+            self.boundary.x + self.boundary.width / 2,
+            self.boundary.y + self.boundary.height / 2
         )
+        self.bottomLeft = self.__create_child(
+            self.boundary.x,
+            self.boundary.y + self.boundary.height / 2
+        )
+
+        # Push down everything that now fits inside one of the new children.
+        objects = self.objects
+        self.objects = []
+        for pygine_object in objects:
+            self.__insert(pygine_object)
 
     def draw(self, surface):
         draw_rectangle(
@@ -134,96 +389,1349 @@ class Quadtree:
             self.bottomLeft.draw(surface)
 
 
-class Bin:
+class FlatQuadtree(SpatialIndex):
+    "A quadtree whose nodes live in flat, pooled arrays that are reused from frame to frame."
+
+    def __init__(self, boundary, capacity, max_depth=8):
+        self.boundary = boundary
+        self.capacity = capacity
+        self.max_depth = max_depth
+
+        # Node i is described by index i of every array below. The four children of a node are stored next to each other, starting at __first_child[i].
+        self.__boundaries = []
+        self.__first_child = []
+        self.__parents = []
+        self.__depths = []
+        self.__objects = []
+        self.__total_nodes = 0
+        # The first node of every group of four children that was collapsed, and can be handed out again.
+        self.__free_children = []
+
+        self.__stack = []
+        self.locations = {}
+        # Incremented whenever an object is added, removed, or relocated to another node; not when it moves within its node.
+        self.version = 0
+
+        self.clear()
+
+    def insert(self, pygine_object):
+        if pygine_object in self.locations:
+            return self.move(pygine_object)
+
+        if not pygine_object.bounds.colliderect(self.boundary):
+            return False
+
+        self.__insert(pygine_object)
+        self.version += 1
+
+        return True
+
+    def remove(self, pygine_object):
+        node = self.locations.pop(pygine_object, -1)
+        if node < 0:
+            return False
+
+        self.__objects[node].remove(pygine_object)
+        self.__collapse(node)
+        self.version += 1
+
+        return True
+
+    def move(self, pygine_object):
+        "Updates the position of an object whose bounds changed. The object is only relocated if it left its node."
+        node = self.locations.get(pygine_object, -1)
+        if node < 0:
+            return self.insert(pygine_object)
+
+        if self.__keeps(node, pygine_object.bounds):
+            return True
+
+        self.__objects[node].remove(pygine_object)
+        del self.locations[pygine_object]
+        self.version += 1
+        moved = self.insert(pygine_object)
+        self.__collapse(node)
+
+        return moved
+
+    def query(self, area, result=None, kind=None, exclude=None):
+        "Returns every object that intersects area, optionally only those matching kind and never exclude. If result is given, it is cleared and filled instead of allocating a new list."
+        if result == None:
+            result = []
+        else:
+            del result[:]
+
+        if not area.colliderect(self.boundary):
+            return result
+
+        filtered = kind != None or exclude != None
+        boundaries = self.__boundaries
+        first_child = self.__first_child
+        all_objects = self.__objects
+        stack = self.__stack
+        stack.append(0)
+
+        while len(stack) > 0:
+            node = stack.pop()
+
+            for pygine_object in all_objects[node]:
+                if (
+                    area.colliderect(pygine_object.bounds) and
+                    (not filtered or _matches(pygine_object, kind, exclude))
+                ):
+                    result.append(pygine_object)
+
+            child = first_child[node]
+            if child < 0:
+                continue
+
+            for i in range(child, child + 4):
+                if area.colliderect(boundaries[i]):
+                    stack.append(i)
+
+        return result
+
+    def query_ray(self, ray):
+        "Returns a (distance, object) pair for everything the ray hits, closest first."
+        hits = []
+        self.__cast(ray, hits, False)
+
+        return _sorted_hits(hits)
+
+    def query_ray_first(self, ray):
+        "Returns a (distance, object) pair for the closest thing the ray hits, or None."
+        hits = []
+        self.__cast(ray, hits, True)
+
+        return hits[0] if len(hits) > 0 else None
+
+    def __cast(self, ray, hits, first):
+        boundaries = self.__boundaries
+        first_child = self.__first_child
+        stack = self.__stack
+        stack.append(0)
+
+        while len(stack) > 0:
+            node = stack.pop()
+
+            # Only visit the nodes the ray passes through, and stop looking past the closest hit.
+            entry = ray.intersects(boundaries[node])
+            if entry < 0 or (first and len(hits) > 0 and entry > hits[0][0]):
+                continue
+
+            for pygine_object in self.__objects[node]:
+                distance = ray.intersects(pygine_object.bounds)
+                if distance >= 0:
+                    _record_hit(hits, distance, pygine_object, first)
+
+            child = first_child[node]
+            if child >= 0:
+                stack.extend(range(child, child + 4))
+
+    def clear(self):
+        for i in range(self.__total_nodes):
+            del self.__objects[i][:]
+
+        self.locations.clear()
+        self.version += 1
+        self.__total_nodes = 1
+        del self.__free_children[:]
+        self.__set_node(
+            0,
+            self.boundary.x,
+            self.boundary.y,
+            self.boundary.width,
+            self.boundary.height,
+            0,
+            -1
+        )
+
+    def __set_node(self, node, x, y, width, height, depth, parent):
+        if node < len(self.__boundaries):
+            # Reuse a node left over from a previous frame, or from a collapsed branch.
+            self.__boundaries[node].update(x, y, width, height)
+            self.__first_child[node] = -1
+            self.__parents[node] = parent
+            self.__depths[node] = depth
+        else:
+            self.__boundaries.append(Rect(x, y, width, height))
+            self.__first_child.append(-1)
+            self.__parents.append(parent)
+            self.__depths.append(depth)
+            self.__objects.append([])
+
+    def __collapse(self, node):
+        # Children that are all empty leaves are handed back to the pool, all the way up the tree.
+        if self.__first_child[node] < 0:
+            node = self.__parents[node]
+        while node >= 0 and self.__has_empty_children(node):
+            self.__free_children.append(self.__first_child[node])
+            self.__first_child[node] = -1
+            node = self.__parents[node]
+
+    def __has_empty_children(self, node):
+        child = self.__first_child[node]
+        for i in range(child, child + 4):
+            if self.__first_child[i] >= 0 or len(self.__objects[i]) > 0:
+                return False
+
+        return True
+
+    def __insert(self, pygine_object):
+        # Objects are stored in the deepest node that completely contains them.
+        bounds = pygine_object.bounds
+        node = 0
+
+        while self.__first_child[node] >= 0:
+            child = self.__child_containing(node, bounds)
+            if child < 0:
+                break
+            node = child
+
+        objects = self.__objects[node]
+        objects.append(pygine_object)
+        self.locations[pygine_object] = node
+
+        if (
+            self.__first_child[node] < 0 and
+            len(objects) > self.capacity and
+            self.__depths[node] < self.max_depth
+        ):
+            self.__subdivide(node)
+
+    def __keeps(self, node, bounds):
+        if node == 0:
+            if not bounds.colliderect(self.boundary):
+                return False
+        elif not self.__boundaries[node].contains(bounds):
+            return False
+
+        return self.__first_child[node] < 0 or self.__child_containing(node, bounds) < 0
+
+    def __child_containing(self, node, bounds):
+        child = self.__first_child[node]
+        for i in range(child, child + 4):
+            if self.__boundaries[i].contains(bounds):
+                return i
+
+        return -1
+
+    def __subdivide(self, node):
+        boundary = self.__boundaries[node]
+        x = boundary.x
+        y = boundary.y
+        half_width = boundary.width // 2
+        half_height = boundary.height // 2
+        depth = self.__depths[node] + 1
+
+        if len(self.__free_children) > 0:
+            child = self.__free_children.pop()
+        else:
+            child = self.__total_nodes
+            self.__total_nodes += 4
+
+        # Top left, top right, bottom right, and then bottom left; the same order Quadtree uses.
+        self.__first_child[node] = child
+        self.__set_node(
+            child, x, y, half_width, half_height, depth, node)
+        self.__set_node(
+            child + 1, x + half_width, y, boundary.width - half_width, half_height, depth, node)
+        self.__set_node(
+            child + 2, x + half_width, y + half_height, boundary.width - half_width, boundary.height - half_height, depth, node)
+        self.__set_node(
+            child + 3, x, y + half_height, half_width, boundary.height - half_height, depth, node)
+
+        # Push down everything that now fits inside one of the new children.
+        objects = self.__objects[node]
+        remaining = 0
+        for i in range(len(objects)):
+            child = self.__child_containing(node, objects[i].bounds)
+            if child < 0:
+                objects[remaining] = objects[i]
+                remaining += 1
+            else:
+                self.__objects[child].append(objects[i])
+                self.locations[objects[i]] = child
+        del objects[remaining:]
+
+    def draw(self, surface):
+        # Collapsed children stay in the arrays until they are reused, so only the nodes still in the tree are drawn.
+        stack = self.__stack
+        stack.append(0)
+
+        while len(stack) > 0:
+            node = stack.pop()
+            draw_rectangle(
+                surface,
+                self.__boundaries[node],
+                CameraType.DYNAMIC,
+                Color.BLACK,
+                1
+            )
+
+            child = self.__first_child[node]
+            if child >= 0:
+                stack.extend(range(child, child + 4))
+
+
+class Bin(SpatialIndex):
+    "A uniform grid. Object bounds are kept in NumPy arrays, and the grid is rebuilt in bulk whenever it is queried after a change."
+
     def __init__(self, boundary, power_of_two):
+        assert (numpy != None), \
+            "Bin requires NumPy! Make sure it is installed, or use a FlatQuadtree instead."
+
         self.boundary = boundary
         self.power_of_two = power_of_two
         self.cell_size = 1 << self.power_of_two
 
-        self.columns = int(math.ceil(float(self.boundary.width / self.power_of_two)))
-        self.rows = int(math.ceil(float(self.boundary.height / self.power_of_two)))
+        self.columns = int(math.ceil(float(self.boundary.width) / self.cell_size))
+        self.rows = int(math.ceil(float(self.boundary.height) / self.cell_size))
+
+        # Row i of __bounds holds the left, top, right, and bottom of __objects[i].
+        self.__objects = []
+        self.__indices = {}
+        self.__bounds = numpy.zeros((16, 4), dtype=numpy.int64)
 
-        self.buckets = [set() for i in range(self.rows * self.columns)]
+        # Every cell's entries are stored contiguously in __entries, starting at __cell_start[cell].
+        self.__entries = numpy.zeros(0, dtype=numpy.int64)
+        self.__cell_start = numpy.zeros(
+            self.rows * self.columns + 1, dtype=numpy.int64)
+        self.__dirty = False
+        # Incremented whenever the contents of the grid change.
+        self.version = 0
 
     def insert(self, pygine_object):
+        if pygine_object in self.__indices:
+            return self.move(pygine_object)
+
         if not pygine_object.bounds.colliderect(self.boundary):
             return False
 
-        ids = self.__hash_ids(pygine_object.bounds)
+        self.__append(pygine_object)
+        self.__write_bounds(self.__indices[pygine_object], pygine_object.bounds)
 
-        for i in ids:
-            self.buckets[i].add(pygine_object)
+        return True
 
-        return len(ids) > 0
+    def insert_many(self, pygine_objects):
+        "Inserts a whole batch of objects at once. Returns how many of them were inserted."
+        inserted = 0
+        fresh = []
+        for e in pygine_objects:
+            if e in self.__indices:
+                # Objects that are already in the grid are only moved, so they never end up in two rows.
+                if self.move(e):
+                    inserted += 1
+            elif e.bounds.colliderect(self.boundary):
+                fresh.append(e)
+        pygine_objects = fresh
+        if len(pygine_objects) == 0:
+            return inserted
 
-    def query(self, area):
-        if not area.colliderect(self.boundary):
-            return []
+        start = len(self.__objects)
+        for pygine_object in pygine_objects:
+            self.__append(pygine_object)
 
-        result = []
-        objects = set()
-        ids = self.__hash_ids(area)
+        bounds = numpy.array(
+            [(e.bounds.left, e.bounds.top, e.bounds.right, e.bounds.bottom)
+             for e in pygine_objects],
+            dtype=numpy.int64
+        )
+        self.__bounds[start:start + len(pygine_objects)] = bounds
 
-        for i in ids:
-            for pygine_object in self.buckets[i]:
-                objects.add(pygine_object)
+        return inserted + len(pygine_objects)
 
-        for pygine_object in objects:
-            result.append(pygine_object)
+    def remove(self, pygine_object):
+        index = self.__indices.pop(pygine_object, -1)
+        if index < 0:
+            return False
+
+        # Swap the last object into the freed row.
+        last = len(self.__objects) - 1
+        if index != last:
+            moved = self.__objects[last]
+            self.__objects[index] = moved
+            self.__indices[moved] = index
+            self.__bounds[index] = self.__bounds[last]
+        self.__objects.pop()
+        self.__dirty = True
+        self.version += 1
 
-        objects.clear()
-        ids.clear()
+        return True
+
+    def move(self, pygine_object):
+        "Updates the position of an object whose bounds changed."
+        index = self.__indices.get(pygine_object, -1)
+        if index < 0:
+            return self.insert(pygine_object)
+
+        if not pygine_object.bounds.colliderect(self.boundary):
+            self.remove(pygine_object)
+            return False
+
+        self.__write_bounds(index, pygine_object.bounds)
+
+        return True
+
+    def query(self, area, result=None, kind=None, exclude=None):
+        "Returns every object that intersects area, optionally only those matching kind and never exclude. If result is given, it is cleared and filled instead of allocating a new list."
+        if result == None:
+            result = []
+        else:
+            del result[:]
+
+        if not area.colliderect(self.boundary) or len(self.__objects) == 0:
+            return result
+
+        if self.__dirty:
+            self.__rebuild()
+
+        first_column, last_column, first_row, last_row = self.__cell_range(
+            area.left, area.top, area.right, area.bottom)
+
+        # The cells of a row are contiguous, so every row only needs a single slice.
+        slices = []
+        for row in range(first_row, last_row + 1):
+            cell = row * self.columns
+            slices.append(self.__entries[
+                self.__cell_start[cell + first_column]:self.__cell_start[cell + last_column + 1]
+            ])
+        candidates = numpy.unique(numpy.concatenate(slices))
+
+        bounds = self.__bounds[candidates]
+        hits = candidates[
+            (bounds[:, 0] < area.right) &
+            (bounds[:, 2] > area.left) &
+            (bounds[:, 1] < area.bottom) &
+            (bounds[:, 3] > area.top)
+        ]
+
+        filtered = kind != None or exclude != None
+        for i in hits:
+            if not filtered or _matches(self.__objects[i], kind, exclude):
+                result.append(self.__objects[i])
 
         return result
 
+    def query_ray(self, ray):
+        "Returns a (distance, object) pair for everything the ray hits, closest first."
+        hits = []
+        self.__cast(ray, hits, False)
+
+        return _sorted_hits(hits)
+
+    def query_ray_first(self, ray):
+        "Returns a (distance, object) pair for the closest thing the ray hits, or None."
+        hits = []
+        self.__cast(ray, hits, True)
+
+        return hits[0] if len(hits) > 0 else None
+
+    def __cast(self, ray, hits, first):
+        entry = ray.intersects(self.boundary)
+        if entry < 0 or len(self.__objects) == 0:
+            return
+
+        if self.__dirty:
+            self.__rebuild()
+
+        # Walk the cells the ray passes through, one at a time (Amanatides and Woo).
+        x = ray.x + ray.direction_x * entry - self.boundary.x
+        y = ray.y + ray.direction_y * entry - self.boundary.y
+        column = min(max(int(x) >> self.power_of_two, 0), self.columns - 1)
+        row = min(max(int(y) >> self.power_of_two, 0), self.rows - 1)
+
+        step_x = 1 if ray.direction_x > 0 else -1
+        step_y = 1 if ray.direction_y > 0 else -1
+        infinity = float("inf")
+        if ray.inverse_x == None:
+            next_x = infinity
+            delta_x = infinity
+        else:
+            boundary_x = (column + (1 if step_x > 0 else 0)) * self.cell_size
+            next_x = entry + (boundary_x - x) * ray.inverse_x
+            delta_x = self.cell_size * abs(ray.inverse_x)
+        if ray.inverse_y == None:
+            next_y = infinity
+            delta_y = infinity
+        else:
+            boundary_y = (row + (1 if step_y > 0 else 0)) * self.cell_size
+            next_y = entry + (boundary_y - y) * ray.inverse_y
+            delta_y = self.cell_size * abs(ray.inverse_y)
+
+        tested = set()
+        while 0 <= column < self.columns and 0 <= row < self.rows:
+            cell = row * self.columns + column
+            for i in self.__entries[self.__cell_start[cell]:self.__cell_start[cell + 1]]:
+                if i in tested:
+                    continue
+                tested.add(i)
+
+                distance = ray.intersects(self.__objects[i].bounds)
+                if distance >= 0:
+                    _record_hit(hits, distance, self.__objects[i], first)
+
+            cell_exit = min(next_x, next_y)
+            if cell_exit > ray.distance or (first and len(hits) > 0 and hits[0][0] <= cell_exit):
+                break
+
+            if next_x < next_y:
+                column += step_x
+                next_x += delta_x
+            else:
+                row += step_y
+                next_y += delta_y
+
     def clear(self):
-        for i in range(len(self.buckets)):
-            self.buckets[i].clear()
-
-    def __hash_ids(self, bounds):
-        result = set()
-        x = -1
-        y = -1
-        
-        if bounds.width > self.cell_size or bounds.height > self.cell_size:
-            for height_offset in range(0, bounds.height, self.cell_size):
-                for width_offset in range(0, bounds.width, self.cell_size):
-                    x = int(bounds.x + width_offset) >> self.power_of_two
-                    y = int(bounds.y + height_offset) >> self.power_of_two
-
-                    if x < 0 or x >= self.columns or y < 0 or y >= self.rows:
-                        continue
-
-                    result.add(self.columns * y + x)
-
-        for i in range(4):
-            if i == 0:
-                x = int(bounds.x) >> self.power_of_two
-                y = int(bounds.y) >> self.power_of_two
-            elif i == 1:
-                x = int(bounds.x + bounds.width) >> self.power_of_two
-                y = int(bounds.y) >> self.power_of_two
-            elif i == 2:
-                x = int(bounds.x + bounds.width) >> self.power_of_two
-                y = int(bounds.y + bounds.height) >> self.power_of_two
-            elif i == 3:
-                x = int(bounds.x) >> self.power_of_two
-                y = int(bounds.y + bounds.height) >> self.power_of_two
-
-            if x < 0 or x >= self.columns or y < 0 or y >= self.rows:
-                continue
+        del self.__objects[:]
+        self.__indices.clear()
+        self.__dirty = True
+        self.version += 1
 
-            result.add(self.columns * y + x)
+    def __append(self, pygine_object):
+        index = len(self.__objects)
+        if index >= len(self.__bounds):
+            self.__bounds = numpy.concatenate(
+                (self.__bounds, numpy.zeros_like(self.__bounds)))
 
-        return result
+        self.__objects.append(pygine_object)
+        self.__indices[pygine_object] = index
+        self.__dirty = True
+        self.version += 1
+
+    def __write_bounds(self, index, bounds):
+        row = self.__bounds[index]
+        if row[0] == bounds.left and row[1] == bounds.top and row[2] == bounds.right and row[3] == bounds.bottom:
+            return
+
+        row[0] = bounds.left
+        row[1] = bounds.top
+        row[2] = bounds.right
+        row[3] = bounds.bottom
+        self.__dirty = True
+        self.version += 1
+
+    def __cell_range(self, left, top, right, bottom):
+        # Works on plain integers as well as whole NumPy arrays.
+        first_column = numpy.clip(
+            (left - self.boundary.x) >> self.power_of_two, 0, self.columns - 1)
+        last_column = numpy.clip(
+            (right - 1 - self.boundary.x) >> self.power_of_two, 0, self.columns - 1)
+        first_row = numpy.clip(
+            (top - self.boundary.y) >> self.power_of_two, 0, self.rows - 1)
+        last_row = numpy.clip(
+            (bottom - 1 - self.boundary.y) >> self.power_of_two, 0, self.rows - 1)
+
+        return first_column, last_column, first_row, last_row
+
+    def __rebuild(self):
+        total = len(self.__objects)
+        bounds = self.__bounds[:total]
+
+        first_column, last_column, first_row, last_row = self.__cell_range(
+            bounds[:, 0], bounds[:, 1], bounds[:, 2], bounds[:, 3])
+
+        # Expand every object into one (cell, object) entry per cell it overlaps.
+        columns = last_column - first_column + 1
+        counts = columns * (last_row - first_row + 1)
+        offsets = numpy.cumsum(counts) - counts
+        ids = numpy.repeat(numpy.arange(total), counts)
+        local = numpy.arange(len(ids)) - numpy.repeat(offsets, counts)
+        cells = (
+            (numpy.repeat(first_row, counts) + local // numpy.repeat(columns, counts)) * self.columns +
+            numpy.repeat(first_column, counts) + local % numpy.repeat(columns, counts)
+        )
+
+        order = numpy.argsort(cells, kind="stable")
+        self.__entries = ids[order]
+        self.__cell_start[0] = 0
+        numpy.cumsum(
+            numpy.bincount(cells, minlength=self.rows * self.columns),
+            out=self.__cell_start[1:]
+        )
+        self.__dirty = False
 
     def draw(self, surface):
         for y in range(self.rows):
             for x in range(self.columns):
                 draw_rectangle(
                     surface,
-                    Rect(x * self.cell_size, y * self.cell_size, self.cell_size, self.cell_size),
+                    Rect(
+                        self.boundary.x + x * self.cell_size,
+                        self.boundary.y + y * self.cell_size,
+                        self.cell_size,
+                        self.cell_size
+                    ),
                     CameraType.DYNAMIC,
                     Color.BLACK,
                     1
-                )
\ No newline at end of file
+                )
+
+
+class SweepAndPrune:
+    "A broadphase that keeps its members sorted along the x axis and reports every pair of overlapping bounds."
+
+    def __init__(self, padding=0):
+        self.padding = padding
+
+        # Members are kept sorted by the left edge of their padded bounds. The order is reused between steps, so sorting is nearly linear.
+        self.objects = []
+        self.__keys = []
+        # The bounds each member was swept with during the last update(), in the same order as objects.
+        self.__boxes = []
+        self.__widest = 0
+
+        self.pairs = []
+        self.__candidates = {}
+        self.__empty = []
+        # Incremented on every update().
+        self.version = 0
+
+    def update(self, pygine_objects, swept_bounds=None):
+        """
+        Synchronizes the members with pygine_objects, re-sorts them, and finds every overlapping pair.
+        swept_bounds can map a member to the whole area it moved through during the step, which is used instead of its bounds.
+        """
+        self.__synchronize(pygine_objects, swept_bounds)
+        self.__sort()
+        self.__sweep()
+        self.version += 1
+
+    def candidates(self, pygine_object, result=None, kind=None):
+        "Returns everything that overlapped pygine_object during the last update(). Do not modify the list unless result is given."
+        candidates = self.__candidates.get(pygine_object, self.__empty)
+        if result == None and kind == None:
+            return candidates
+
+        if result == None:
+            result = []
+        else:
+            del result[:]
+
+        for e in candidates:
+            if _matches(e, kind, None):
+                result.append(e)
+
+        return result
+
+    def query(self, area, result=None, kind=None, exclude=None):
+        "Returns every member that intersects area, optionally only those matching kind and never exclude."
+        if result == None:
+            result = []
+        else:
+            del result[:]
+
+        filtered = kind != None or exclude != None
+
+        keys = self.__keys
+        left = area.left - self.__widest - self.padding
+        right = area.right + self.padding
+
+        # Skip everything whose left edge is too far away to reach area.
+        low = 0
+        high = len(keys)
+        while low < high:
+            middle = (low + high) // 2
+            if keys[middle] < left:
+                low = middle + 1
+            else:
+                high = middle
+
+        for i in range(low, len(keys)):
+            if keys[i] >= right:
+                break
+            if (
+                area.colliderect(self.objects[i].bounds) and
+                (not filtered or _matches(self.objects[i], kind, exclude))
+            ):
+                result.append(self.objects[i])
+
+        return result
+
+    def query_ray(self, ray):
+        "Returns a (distance, object) pair for everything the ray hits, closest first."
+        hits = []
+        self.__cast(ray, hits, False)
+
+        return _sorted_hits(hits)
+
+    def query_ray_first(self, ray):
+        "Returns a (distance, object) pair for the closest thing the ray hits, or None."
+        hits = []
+        self.__cast(ray, hits, True)
+
+        return hits[0] if len(hits) > 0 else None
+
+    def __cast(self, ray, hits, first):
+        # Only the members whose x range overlaps the ray's need to be tested.
+        left = ray.x
+        right = ray.x
+        if ray.distance == float("inf"):
+            if ray.direction_x < 0:
+                left = -float("inf")
+            elif ray.direction_x > 0:
+                right = float("inf")
+        else:
+            end = ray.x + ray.direction_x * ray.distance
+            left = min(left, end)
+            right = max(right, end)
+
+        keys = self.__keys
+        for i in range(len(keys)):
+            if keys[i] + self.padding > right:
+                break
+            if keys[i] + self.padding + self.__widest < left:
+                continue
+
+            distance = ray.intersects(self.objects[i].bounds)
+            if distance >= 0:
+                _record_hit(hits, distance, self.objects[i], first)
+
+    def clear(self):
+        del self.objects[:]
+        del self.__keys[:]
+        del self.__boxes[:]
+        del self.pairs[:]
+        self.__candidates.clear()
+        self.version += 1
+
+    def __synchronize(self, pygine_objects, swept_bounds):
+        members = self.__candidates
+        current = set(pygine_objects)
+
+        if len(current) != len(members) or any(e not in members for e in current):
+            self.objects = [e for e in self.objects if e in current]
+
+            members.clear()
+            for pygine_object in self.objects:
+                members[pygine_object] = []
+
+            for pygine_object in pygine_objects:
+                if pygine_object not in members:
+                    members[pygine_object] = []
+                    self.objects.append(pygine_object)
+
+        del self.__keys[:]
+        del self.__boxes[:]
+        self.__widest = 0
+        for pygine_object in self.objects:
+            box = pygine_object.bounds
+            if swept_bounds != None:
+                box = swept_bounds.get(pygine_object, box)
+            self.__keys.append(box.left - self.padding)
+            self.__boxes.append(box)
+            if box.width > self.__widest:
+                self.__widest = box.width
+
+    def __sort(self):
+        # Insertion sort; objects rarely swap places between steps.
+        objects = self.objects
+        keys = self.__keys
+        boxes = self.__boxes
+        for i in range(1, len(keys)):
+            key = keys[i]
+            pygine_object = objects[i]
+            box = boxes[i]
+            j = i - 1
+            while j >= 0 and keys[j] > key:
+                keys[j + 1] = keys[j]
+                objects[j + 1] = objects[j]
+                boxes[j + 1] = boxes[j]
+                j -= 1
+            keys[j + 1] = key
+            objects[j + 1] = pygine_object
+            boxes[j + 1] = box
+
+    def __sweep(self):
+        objects = self.objects
+        keys = self.__keys
+        boxes = self.__boxes
+        padding = self.padding
+        pairs = self.pairs
+        candidates = self.__candidates
+
+        del pairs[:]
+        for pygine_object in objects:
+            del candidates[pygine_object][:]
+
+        for i in range(len(objects)):
+            a = boxes[i]
+            right = a.right + padding
+            top = a.top - padding
+            bottom = a.bottom + padding
+
+            for j in range(i + 1, len(objects)):
+                if keys[j] >= right:
+                    break
+
+                b = boxes[j]
+                if b.top - padding < bottom and b.bottom + padding > top:
+                    pairs.append((objects[i], objects[j]))
+                    candidates[objects[i]].append(objects[j])
+                    candidates[objects[j]].append(objects[i])
+
+
+class MergedBounds:
+    "Stands in for adjacent, collinear objects that a BoundingVolumeHierarchy merged. Its bounds cover every one of them, and members holds the originals."
+
+    def __init__(self, bounds, members):
+        self.bounds = bounds
+        self.members = members
+
+    def set_color(self, color):
+        for member in self.members:
+            member.set_color(color)
+
+
+class BoundingVolumeHierarchy:
+    "A bounding volume hierarchy for geometry that never moves. It is built once, and only needs to be rebuilt when that geometry changes."
+
+    LEAF_SIZE = 2
+
+    def __init__(self, merge_type=None):
+        # Adjacent, collinear objects of exactly merge_type are grouped into a single MergedBounds at build time.
+        self.merge_type = merge_type
+
+        # Node i is described by index i of every array below. Leaves point at a run of __items, branches at two children.
+        self.__boundaries = []
+        self.__left = []
+        self.__right = []
+        self.__start = []
+        self.__count = []
+        self.__items = []
+
+        self.__stack = []
+        self.__distances = []
+        # Incremented on every build().
+        self.version = 0
+
+    def build(self, pygine_objects):
+        del self.__boundaries[:]
+        del self.__left[:]
+        del self.__right[:]
+        del self.__start[:]
+        del self.__count[:]
+
+        self.__items = [e for e in pygine_objects]
+        if self.merge_type != None:
+            self.__items = self.__merge(self.__items)
+
+        if len(self.__items) > 0:
+            self.__build(0, len(self.__items))
+
+        self.version += 1
+
+    def query(self, area, result, kind=None, exclude=None):
+        """
+        Fills result with every object that intersects area and matches kind, sorted by their distance from the center of area. Nothing is allocated.
+        Merged objects are returned as their MergedBounds, which matches kind and exclude like its members do.
+        """
+        del result[:]
+        if len(self.__boundaries) == 0:
+            return result
+
+        distances = self.__distances
+        del distances[:]
+
+        filtered = kind != None or exclude != None
+        center_x = area.centerx
+        center_y = area.centery
+        stack = self.__stack
+        stack.append(0)
+
+        while len(stack) > 0:
+            node = stack.pop()
+            if not area.colliderect(self.__boundaries[node]):
+                continue
+
+            if self.__left[node] >= 0:
+                stack.append(self.__left[node])
+                stack.append(self.__right[node])
+                continue
+
+            for i in range(self.__start[node], self.__start[node] + self.__count[node]):
+                bounds = self.__items[i].bounds
+                if not area.colliderect(bounds):
+                    continue
+                if filtered and not self.__matches(self.__items[i], kind, exclude):
+                    continue
+
+                # The squared distance from the center of area to the closest point of bounds.
+                x = min(max(center_x, bounds.left), bounds.right) - center_x
+                y = min(max(center_y, bounds.top), bounds.bottom) - center_y
+                distance = x * x + y * y
+
+                # Insertion sort as we go; there are only ever a handful of hits.
+                result.append(self.__items[i])
+                distances.append(distance)
+                j = len(result) - 1
+                while j > 0 and distances[j - 1] > distance:
+                    result[j] = result[j - 1]
+                    distances[j] = distances[j - 1]
+                    j -= 1
+                result[j] = self.__items[i]
+                distances[j] = distance
+
+        return result
+
+    def query_ray(self, ray):
+        "Returns a (distance, object) pair for everything the ray hits, closest first."
+        hits = []
+        self.__cast(ray, hits, False)
+
+        return _sorted_hits(hits)
+
+    def query_ray_first(self, ray):
+        "Returns a (distance, object) pair for the closest thing the ray hits, or None."
+        hits = []
+        self.__cast(ray, hits, True)
+
+        return hits[0] if len(hits) > 0 else None
+
+    def __cast(self, ray, hits, first):
+        if len(self.__boundaries) == 0:
+            return
+
+        stack = self.__stack
+        stack.append(0)
+
+        while len(stack) > 0:
+            node = stack.pop()
+
+            entry = ray.intersects(self.__boundaries[node])
+            if entry < 0 or (first and len(hits) > 0 and entry > hits[0][0]):
+                continue
+
+            if self.__left[node] >= 0:
+                stack.append(self.__left[node])
+                stack.append(self.__right[node])
+                continue
+
+            for i in range(self.__start[node], self.__start[node] + self.__count[node]):
+                distance = ray.intersects(self.__items[i].bounds)
+                if distance >= 0:
+                    _record_hit(hits, distance, self.__items[i], first)
+
+    def clear(self):
+        self.build([])
+
+    def __matches(self, pygine_object, kind, exclude):
+        if type(pygine_object) == MergedBounds:
+            return exclude not in pygine_object.members and _matches(pygine_object.members[0], kind, None)
+
+        return _matches(pygine_object, kind, exclude)
+
+    def __build(self, start, end):
+        node = len(self.__boundaries)
+        boundary = Rect(self.__items[start].bounds)
+        for i in range(start + 1, end):
+            boundary.union_ip(self.__items[i].bounds)
+
+        self.__boundaries.append(boundary)
+        self.__left.append(-1)
+        self.__right.append(-1)
+        self.__start.append(start)
+        self.__count.append(end - start)
+
+        if end - start <= BoundingVolumeHierarchy.LEAF_SIZE:
+            return node
+
+        # Split the longest axis at the median.
+        if boundary.width >= boundary.height:
+            self.__items[start:end] = sorted(
+                self.__items[start:end], key=lambda e: e.bounds.centerx)
+        else:
+            self.__items[start:end] = sorted(
+                self.__items[start:end], key=lambda e: e.bounds.centery)
+
+        middle = (start + end) // 2
+        self.__left[node] = self.__build(start, middle)
+        self.__right[node] = self.__build(middle, end)
+
+        return node
+
+    def __merge(self, pygine_objects):
+        mergeable = [e for e in pygine_objects if type(e) == self.merge_type]
+        result = [e for e in pygine_objects if type(e) != self.merge_type]
+
+        # Every run is a [bounds, members] pair.
+        runs = [[Rect(e.bounds), [e]] for e in mergeable]
+
+        # Merge horizontal runs first, and then stack whatever is left vertically.
+        runs = self.__merge_runs(
+            runs,
+            lambda r: (r.top, r.height, r.left),
+            lambda a, b: a[0].top == b[0].top and a[0].height == b[0].height and a[0].right >= b[0].left
+        )
+        runs = self.__merge_runs(
+            runs,
+            lambda r: (r.left, r.width, r.top),
+            lambda a, b: a[0].left == b[0].left and a[0].width == b[0].width and a[0].bottom >= b[0].top
+        )
+
+        for bounds, members in runs:
+            if len(members) == 1:
+                result.append(members[0])
+            else:
+                result.append(MergedBounds(bounds, members))
+
+        return result
+
+    def __merge_runs(self, runs, key, adjacent):
+        result = []
+        for run in sorted(runs, key=lambda run: key(run[0])):
+            if len(result) > 0 and adjacent(result[-1], run):
+                result[-1][0].union_ip(run[0])
+                result[-1][1].extend(run[1])
+            else:
+                result.append(run)
+
+        return result
+
+
+class EntityStore:
+    """
+    Holds the entities of a scene in a list, and hands out generational handles to them.
+    It can be used like the list it replaces, but removing an entity never searches for it, and entities can be found by type without a scan.
+    """
+
+    # A handle packs a slot into its low bits and the generation of that slot above them.
+    SLOT_BITS = 20
+
+    def __init__(self, entities=()):
+        self.__entities = []
+        # The entity in each slot, or None while the slot is free.
+        self.__slots = []
+        self.__generations = []
+        self.__free_slots = []
+        self.__slot_of = {}
+        # Where each entity is in the list.
+        self.__positions = {}
+        # Every entity is indexed under each class it is an instance of, in the order they were added.
+        self.__by_type = {}
+
+        for entity in entities:
+            self.append(entity)
+
+    def append(self, entity):
+        "Adds an entity at the end, and returns its handle."
+        if entity in self.__slot_of:
+            raise ValueError("EntityStore.append(entity): entity is already in the store")
+
+        if len(self.__free_slots) > 0:
+            slot = self.__free_slots.pop()
+        else:
+            slot = len(self.__slots)
+            self.__slots.append(None)
+            self.__generations.append(0)
+
+        self.__slots[slot] = entity
+        self.__slot_of[entity] = slot
+        self.__positions[entity] = len(self.__entities)
+        self.__entities.append(entity)
+        self.__index(entity)
+
+        return self.__generations[slot] << EntityStore.SLOT_BITS | slot
+
+    def extend(self, entities):
+        for entity in entities:
+            self.append(entity)
+
+    def remove(self, entity):
+        "Removes an entity by moving the last entity into its place, so the order of the rest is not kept."
+        slot = self.__slot_of.pop(entity, -1)
+        if slot < 0:
+            raise ValueError("EntityStore.remove(entity): entity is not in the store")
+        self.__free(slot)
+        self.__unindex(entity)
+
+        entities = self.__entities
+        position = self.__positions.pop(entity)
+        last = entities.pop()
+        if last is not entity:
+            entities[position] = last
+            self.__positions[last] = position
+
+    def remove_flagged(self, on_removed=None):
+        """
+        Removes every entity whose remove flag is set in a single pass, which keeps the order of the rest.
+        Afterwards, on_removed is called with each removed entity.
+        """
+        entities = self.__entities
+        removed = [e for e in entities if e.remove]
+        if len(removed) == 0:
+            return removed
+
+        # Everything in front of the first removed entity stays where it is, so only the rest is compacted and renumbered.
+        positions = self.__positions
+        first = positions[removed[0]]
+        entities[first:] = [e for e in entities[first:] if not e.remove]
+        for entity in removed:
+            self.__free(self.__slot_of.pop(entity))
+            self.__unindex(entity)
+            del positions[entity]
+        positions.update(zip(entities[first:], range(first, len(entities))))
+
+        if on_removed != None:
+            for entity in removed:
+                on_removed(entity)
+
+        return removed
+
+    def of_type(self, entity_type):
+        "Returns every entity that is an instance of entity_type, in the order they were added. Do not modify the store while iterating over it."
+        entities = self.__by_type.get(entity_type)
+        if entities == None:
+            return ()
+
+        return entities.keys()
+
+    def get(self, handle):
+        "Returns the entity a handle refers to, or None once that entity was removed."
+        slot = handle & ((1 << EntityStore.SLOT_BITS) - 1)
+        if slot >= len(self.__slots) or self.__generations[slot] != handle >> EntityStore.SLOT_BITS:
+            return None
+
+        return self.__slots[slot]
+
+    def handle_of(self, entity):
+        "Returns the handle of an entity in the store, or -1."
+        slot = self.__slot_of.get(entity, -1)
+        if slot < 0:
+            return -1
+
+        return self.__generations[slot] << EntityStore.SLOT_BITS | slot
+
+    def clear(self):
+        for slot in self.__slot_of.values():
+            self.__free(slot)
+        del self.__entities[:]
+        self.__slot_of.clear()
+        self.__positions = {}
+        self.__by_type.clear()
+
+    def __index(self, entity):
+        for entity_type in type(entity).__mro__:
+            entities = self.__by_type.get(entity_type)
+            if entities == None:
+                entities = self.__by_type[entity_type] = {}
+            entities[entity] = None
+
+    def __unindex(self, entity):
+        for entity_type in type(entity).__mro__:
+            del self.__by_type[entity_type][entity]
+
+    def __free(self, slot):
+        # Bumping the generation makes every handle to the old entity stale.
+        self.__slots[slot] = None
+        self.__generations[slot] += 1
+        self.__free_slots.append(slot)
+
+    def __len__(self):
+        return len(self.__entities)
+
+    def __getitem__(self, index):
+        return self.__entities[index]
+
+    def __iter__(self):
+        return iter(self.__entities)
+
+    def __reversed__(self):
+        return reversed(self.__entities)
+
+    def __contains__(self, entity):
+        return entity in self.__slot_of
+
+
+class IndexType(IntEnum):
+    QUADTREE = 0
+    GRID = 1
+    LINKED_QUADTREE = 2
+
+
+def create_spatial_index(index_type, boundary, capacity=4, max_depth=8, power_of_two=5):
+    "Creates the SpatialIndex that index_type describes. Grids use cells of 2^power_of_two pixels."
+    if index_type == IndexType.GRID:
+        return Bin(boundary, power_of_two)
+    if index_type == IndexType.LINKED_QUADTREE:
+        return Quadtree(boundary, capacity, max_depth)
+
+    return FlatQuadtree(boundary, capacity, max_depth)
+
+
+class MeasuredIndex(SpatialIndex):
+    "Stands in for a spatial index, and tells a PartitionTuner how long every query made through it took."
+
+    def __init__(self, partition_tuner):
+        self.partition_tuner = partition_tuner
+        self.spatial_index = None
+
+    @property
+    def version(self):
+        return self.spatial_index.version
+
+    def insert(self, pygine_object):
+        return self.spatial_index.insert(pygine_object)
+
+    def remove(self, pygine_object):
+        return self.spatial_index.remove(pygine_object)
+
+    def move(self, pygine_object):
+        return self.spatial_index.move(pygine_object)
+
+    def query(self, area, result=None, kind=None, exclude=None):
+        started = time.perf_counter()
+        result = self.spatial_index.query(area, result, kind, exclude)
+        self.partition_tuner.record_query(time.perf_counter() - started)
+
+        return result
+
+    def query_ray(self, ray):
+        started = time.perf_counter()
+        hits = self.spatial_index.query_ray(ray)
+        self.partition_tuner.record_query(time.perf_counter() - started)
+
+        return hits
+
+    def query_ray_first(self, ray):
+        started = time.perf_counter()
+        hit = self.spatial_index.query_ray_first(ray)
+        self.partition_tuner.record_query(time.perf_counter() - started)
+
+        return hit
+
+    def clear(self):
+        self.spatial_index.clear()
+
+    def draw(self, surface):
+        self.spatial_index.draw(surface)
+
+
+class PartitionTuner:
+    """
+    Samples how many objects a scene holds, how large they are, and what maintaining and querying their index costs, and picks the index parameters that suit them.
+    Costs are only compared between parameters that were measured under a similar load.
+    """
+
+    # How many samples are collected before the parameters are reconsidered.
+    SAMPLE_INTERVAL = 60
+    MINIMUM_CAPACITY = 4
+    MAXIMUM_CAPACITY = 16
+    MAXIMUM_DEPTH = 8
+    # A grid only pays off once there are enough objects, and only if they are all roughly the same size.
+    GRID_THRESHOLD = 32
+    GRID_UNIFORMITY = 2
+    COST_SMOOTHING = 0.1
+
+    def __init__(self, boundary):
+        self.boundary = Rect(boundary)
+
+        self.index_type = IndexType.QUADTREE
+        self.capacity = PartitionTuner.MINIMUM_CAPACITY
+        self.max_depth = PartitionTuner.MAXIMUM_DEPTH
+        self.power_of_two = 0
+        self.parameters = self.__parameters()
+
+        # The smoothed cost of every (load, parameters) that has been tried, in seconds per object per sample.
+        # The load is the average object count rounded down to a power of two, so only similar loads share a cost.
+        self.costs = {}
+        # How many queries went through the measured index, and how long they took, since the tuner was created.
+        self.queries = 0
+        self.query_time = 0
+
+        self.__samples = 0
+        self.__total_count = 0
+        self.__total_dimension = 0
+        self.__largest_dimension = 0
+        self.__started = 0
+        self.__elapsed = 0
+        self.__measured_index = MeasuredIndex(self)
+
+    def sample(self, pygine_objects):
+        self.__samples += 1
+        self.__total_count += len(pygine_objects)
+        for pygine_object in pygine_objects:
+            dimension = max(pygine_object.bounds.width,
+                            pygine_object.bounds.height)
+            self.__total_dimension += dimension
+            if dimension > self.__largest_dimension:
+                self.__largest_dimension = dimension
+
+    def start_measurement(self):
+        self.__started = time.perf_counter()
+
+    def stop_measurement(self):
+        self.__elapsed += time.perf_counter() - self.__started
+
+    def measure(self, spatial_index):
+        "Returns a stand-in for spatial_index that times every query made through it. Hand it to whatever queries the index."
+        self.__measured_index.spatial_index = spatial_index
+
+        return self.__measured_index
+
+    def record_query(self, elapsed):
+        self.queries += 1
+        self.query_time += elapsed
+        self.__elapsed += elapsed
+
+    def tune(self):
+        "Reconsiders the parameters once enough samples were collected. Returns whether the parameters changed."
+        if self.__samples < PartitionTuner.SAMPLE_INTERVAL:
+            return False
+
+        average_count = float(self.__total_count) / self.__samples
+        average_dimension = float(self.__total_dimension) / \
+            max(self.__total_count, 1)
+        largest_dimension = self.__largest_dimension
+        load = 1 << int(math.log(average_count + 1, 2))
+
+        # Maintenance and queries both grow with the number of objects, so the cost is per object.
+        cost = self.__elapsed / max(self.__total_count, 1)
+        previous = self.costs.get((load, self.parameters))
+        if previous == None:
+            self.costs[(load, self.parameters)] = cost
+        else:
+            self.costs[(load, self.parameters)] = previous + \
+                (cost - previous) * PartitionTuner.COST_SMOOTHING
+
+        self.__samples = 0
+        self.__total_count = 0
+        self.__total_dimension = 0
+        self.__largest_dimension = 0
+        self.__elapsed = 0
+
+        # Leaves should hold roughly the square root of everything, and should never become smaller than an average object.
+        capacity = int(round(math.sqrt(average_count)))
+        capacity = min(max(capacity, PartitionTuner.MINIMUM_CAPACITY),
+                       PartitionTuner.MAXIMUM_CAPACITY)
+        smallest_side = min(self.boundary.width, self.boundary.height)
+        max_depth = int(math.floor(
+            math.log(max(smallest_side / max(average_dimension, 1), 2), 2)))
+        max_depth = min(max_depth, PartitionTuner.MAXIMUM_DEPTH)
+
+        index_type = IndexType.QUADTREE
+        power_of_two = 0
+        if numpy != None and average_count >= PartitionTuner.GRID_THRESHOLD and largest_dimension <= average_dimension * PartitionTuner.GRID_UNIFORMITY:
+            index_type = IndexType.GRID
+            power_of_two = int(math.ceil(math.log(max(largest_dimension, 2), 2)))
+
+        parameters = (index_type, capacity, max_depth, power_of_two)
+
+        # Measurements outrank the heuristic. What it proposes is tried once under each load, and from then on whatever was measured to be the cheapest under that load is used.
+        best_cost = self.costs.get((load, parameters))
+        if best_cost != None:
+            for (measured_load, measured), measured_cost in self.costs.items():
+                if measured_load == load and measured_cost < best_cost:
+                    parameters = measured
+                    best_cost = measured_cost
+
+        if parameters == self.parameters:
+            return False
+
+        self.index_type, self.capacity, self.max_depth, self.power_of_two = parameters
+        self.parameters = parameters
+
+        return True
+
+    def __parameters(self):
+        return (self.index_type, self.capacity, self.max_depth, self.power_of_two)
@@ -31,7 +31,7 @@ class Trigger(PygineObject):
         else:
             next_scene.relay_entity(entity)
 
-        current_scene.entities.remove(entity)
+        current_scene.remove_entity(entity)
         entity.set_location(self.end_location.x, self.end_location.y)
 
         self.triggered = True
@@ -50,10 +50,10 @@ class CollisionTrigger(Trigger):
         super(CollisionTrigger, self).__init__(
             x, y, width, height, end_location, next_scene)
         self.direction = direction
-        self.query_result = None
+        self.query_result = []
 
     def __collision(self, scene_data, manager):
-        self.query_result = scene_data.entity_quad_tree.query(self.bounds)
+        scene_data.entity_quad_tree.query(self.bounds, self.query_result)
         for e in self.query_result:
             if e.bounds.colliderect(self.bounds):
                 self._move_entity_to_next_scene(e, manager)
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class KeyState:
+    "The keys held down during one frame of a replay, indexable like pygame.key.get_pressed()."
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+
+def record_input(frames):
+    "Walks back and forth, jumps every so often, and fires in bursts."
+    import pygame
+
+    recording = []
+    for frame in range(frames):
+        keys = set([pygame.K_u])
+        keys.add(pygame.K_LEFT if (frame // 90) % 2 == 0 else pygame.K_RIGHT)
+        if (frame // 200) % 2 == 1:
+            keys.add(pygame.K_UP)
+        if frame % 50 < 10:
+            keys.add(pygame.K_j)
+        recording.append(KeyState(keys))
+
+    return recording
+
+
+def replay(scene_name, seed, frames):
+    """
+    Plays a recorded input through one boss fight in deterministic mode, and returns an MD5 of the simulated state after every frame.
+    Raises an AssertionError if a body ever leaves the sub-pixel grid.
+    """
+    import pygine.input as input
+    import pygine.scenes as scenes
+    from pygine.entities import Boss, Kinetic, PlayerA
+    from pygine.root import Game
+    from pygine.scenes import SceneType
+
+    # Music has no say in the simulation, and not every song ships with the repository.
+    scenes.play_song = lambda filename, volume=0.75: None
+
+    game = Game(deterministic=True, seed=seed)
+    scene = game.scene_manager.get_scene(
+        SceneType.BOSSA if scene_name == "a" else SceneType.BOSSB)
+    scene.relay_actor(PlayerA(-128, -128))
+
+    digest = hashlib.md5()
+    previous = KeyState(set())
+    for keys in record_input(frames):
+        input.previous_key_state = previous
+        input.current_key_state = keys
+        previous = keys
+
+        # Deterministic runs count every frame as exactly one frame.
+        scene.update(1.0 / game.target_fps)
+        scene.draw(game.window)
+
+        bodies = list(scene.of_type(Kinetic))
+        for boss in scene.of_type(Boss):
+            bodies.extend(boss.get_parts())
+        for body in bodies:
+            assert body.x * 256 == body.subpixel_x and body.y * 256 == body.subpixel_y, \
+                "{} left the sub-pixel grid.".format(type(body).__name__)
+            digest.update(repr((
+                type(body).__name__,
+                body.subpixel_x,
+                body.subpixel_y,
+                body.velocity.subpixel_x,
+                body.velocity.subpixel_y
+            )).encode())
+        for boss in scene.of_type(Boss):
+            digest.update(repr(boss.health).encode())
+
+    return digest.hexdigest()
+
+
+def run_replay(scene_name, seed, frames):
+    "Replays in a fresh interpreter, since deterministic mode is global to the process."
+    environment = dict(os.environ)
+    environment["SDL_VIDEODRIVER"] = "dummy"
+    environment["SDL_AUDIODRIVER"] = "dummy"
+    environment["PYTHONPATH"] = ROOT
+
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), scene_name, str(seed), str(frames)],
+        cwd=ROOT,
+        env=environment
+    )
+
+    return output.decode().strip().splitlines()[-1]
+
+
+@pytest.mark.parametrize("scene_name", ["a", "b"])
+def test_replays_are_bit_identical(scene_name):
+    first = run_replay(scene_name, 3, 600)
+    second = run_replay(scene_name, 3, 600)
+
+    assert len(first) == 32
+    assert first == second
+
+
+if __name__ == "__main__":
+    print(replay(sys.argv[1], int(sys.argv[2]), int(sys.argv[3])))
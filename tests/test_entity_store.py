@@ -0,0 +1,110 @@
+import pytest
+
+from pygine.structures import EntityStore
+
+
+class Thing:
+    def __init__(self, name):
+        self.name = name
+        self.remove = False
+
+    def __repr__(self):
+        return self.name
+
+
+class Crate(Thing):
+    pass
+
+
+def create_things(count=8):
+    return [(Crate if i % 3 == 0 else Thing)("t{}".format(i)) for i in range(count)]
+
+
+def test_handles_find_entities_until_they_are_removed():
+    things = create_things()
+    store = EntityStore()
+    handles = [store.append(e) for e in things]
+
+    for thing, handle in zip(things, handles):
+        assert store.get(handle) is thing
+        assert store.handle_of(thing) == handle
+
+    store.remove(things[2])
+    assert store.get(handles[2]) == None
+    assert store.handle_of(things[2]) == -1
+
+    # The freed slot is reused, but the new handle has a newer generation, so the old one stays stale.
+    replacement = Thing("replacement")
+    handle = store.append(replacement)
+    assert handle & ((1 << EntityStore.SLOT_BITS) - 1) == handles[2] & ((1 << EntityStore.SLOT_BITS) - 1)
+    assert handle != handles[2]
+    assert store.get(handle) is replacement
+    assert store.get(handles[2]) == None
+
+
+def test_remove_moves_the_last_entity_into_place():
+    things = create_things()
+    store = EntityStore(things)
+
+    store.remove(things[1])
+    assert list(store) == [things[0], things[7]] + things[2:7]
+
+    store.remove(things[7])
+    assert list(store) == [things[0], things[6]] + things[2:6]
+
+    # Positions are kept up to date, so removing the entity that was moved works too.
+    store.remove(things[6])
+    assert list(store) == [things[0], things[5]] + things[2:5]
+    assert len(store) == 5
+
+
+def test_remove_flagged_keeps_the_order():
+    things = create_things()
+    store = EntityStore(things)
+    for i in (1, 4, 5):
+        things[i].remove = True
+
+    removed = []
+    assert store.remove_flagged(removed.append) == [things[1], things[4], things[5]]
+    assert removed == [things[1], things[4], things[5]]
+    assert list(store) == [things[0], things[2], things[3], things[6], things[7]]
+    assert things[4] not in store
+
+    # Whatever was compacted can still be removed one at a time afterwards.
+    store.remove(things[3])
+    assert list(store) == [things[0], things[2], things[7], things[6]]
+    assert store.remove_flagged() == []
+
+
+def test_type_index():
+    things = create_things()
+    store = EntityStore(things)
+
+    assert list(store.of_type(Crate)) == [e for e in things if isinstance(e, Crate)]
+    assert list(store.of_type(Thing)) == things
+    assert list(store.of_type(int)) == []
+
+    store.remove(things[0])
+    things[3].remove = True
+    store.remove_flagged()
+    assert list(store.of_type(Crate)) == [things[6]]
+    # The index keeps the order entities were added in, even where removing one moved another in the list.
+    assert list(store.of_type(Thing)) == [things[1], things[2], things[4], things[5], things[6], things[7]]
+    assert list(store)[:2] == [things[7], things[1]]
+
+    store.clear()
+    assert len(store) == 0
+    assert list(store.of_type(Thing)) == []
+
+
+def test_adding_or_removing_twice_raises():
+    things = create_things()
+    store = EntityStore(things)
+
+    with pytest.raises(ValueError):
+        store.append(things[3])
+    assert len(store) == len(things)
+
+    store.remove(things[3])
+    with pytest.raises(ValueError):
+        store.remove(things[3])
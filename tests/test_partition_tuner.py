@@ -0,0 +1,93 @@
+import pytest
+from pygame import Rect
+
+from pygine.structures import IndexType, PartitionTuner
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+BOUNDARY = Rect(0, 0, 320, 240)
+
+
+class Box:
+    def __init__(self, width, height):
+        self.bounds = Rect(0, 0, width, height)
+
+
+def feed(tuner, boxes, query_time, samples=PartitionTuner.SAMPLE_INTERVAL):
+    # Query times are recorded directly, so the costs do not depend on how fast the machine running the tests is.
+    for i in range(samples):
+        tuner.sample(boxes)
+        tuner.record_query(query_time)
+
+
+def test_waits_for_enough_samples():
+    tuner = PartitionTuner(BOUNDARY)
+    parameters = tuner.parameters
+
+    feed(tuner, [Box(8, 8)] * 100, 0.001, PartitionTuner.SAMPLE_INTERVAL - 1)
+    assert not tuner.tune()
+    assert tuner.parameters == parameters
+    assert tuner.costs == {}
+
+
+def test_capacity_and_depth_follow_the_objects():
+    tuner = PartitionTuner(BOUNDARY)
+
+    # A hundred objects of very different sizes want about ten per leaf, and leaves no smaller than an average object.
+    feed(tuner, [Box(4, 4)] * 75 + [Box(64, 64)] * 25, 0.001)
+    assert tuner.tune()
+    assert tuner.parameters == (IndexType.QUADTREE, 10, 3, 0)
+    assert (tuner.capacity, tuner.max_depth) == (10, 3)
+
+    # Once a few large objects are all that is left, the tree gets shallower and its leaves go back to the minimum.
+    feed(tuner, [Box(100, 100)] * 3, 0.001)
+    assert tuner.tune()
+    assert tuner.parameters == (IndexType.QUADTREE, PartitionTuner.MINIMUM_CAPACITY, 1, 0)
+
+
+@pytest.mark.skipif(numpy == None, reason="The grid requires NumPy.")
+def test_many_uniform_objects_switch_to_a_grid():
+    tuner = PartitionTuner(BOUNDARY)
+
+    feed(tuner, [Box(10, 12)] * 64, 0.001)
+    assert tuner.tune()
+    assert tuner.index_type == IndexType.GRID
+    # Cells are the smallest power of two an object fits in.
+    assert tuner.power_of_two == 4
+
+    # A handful of objects is better off in a quadtree.
+    feed(tuner, [Box(10, 12)] * 16, 0.001)
+    assert tuner.tune()
+    assert tuner.index_type == IndexType.QUADTREE
+
+
+@pytest.mark.skipif(numpy == None, reason="The grid requires NumPy.")
+def test_measurements_outrank_the_heuristic():
+    tuner = PartitionTuner(BOUNDARY)
+    boxes = [Box(10, 12)] * 64
+    initial = tuner.parameters
+
+    # The heuristic proposes a grid, which has not been measured yet, so it is tried.
+    feed(tuner, boxes, 0.001)
+    assert tuner.tune()
+    grid = tuner.parameters
+    assert grid[0] == IndexType.GRID
+
+    # The grid turns out to be slower under the same load, so the tuner goes back to what it measured before.
+    feed(tuner, boxes, 0.01)
+    assert tuner.tune()
+    assert tuner.parameters == initial
+
+    # Having measured both, it stays with the cheaper one.
+    feed(tuner, boxes, 0.001)
+    assert not tuner.tune()
+    assert tuner.parameters == initial
+
+    # A different load is measured separately, so the grid is tried again there.
+    feed(tuner, boxes * 4, 0.001)
+    assert tuner.tune()
+    assert tuner.parameters[0] == IndexType.GRID
@@ -0,0 +1,112 @@
+import pytest
+from pygame import Rect
+
+from pygine.physics import CollisionDispatcher, CollisionLayer, SimulationClock, time_of_impact
+
+
+class Body:
+    def __init__(self, name, collision_layer, collision_mask):
+        self.name = name
+        self.collision_layer = collision_layer
+        self.collision_mask = collision_mask
+
+
+def test_time_of_impact_along_one_axis():
+    obstacle = Rect(100, 0, 10, 10)
+
+    assert time_of_impact(Rect(0, 0, 10, 10), 200, 0, obstacle) == pytest.approx(90 / 200.0)
+    assert time_of_impact(Rect(200, 0, 10, 10), -200, 0, obstacle) == pytest.approx(90 / 200.0)
+    # Stopping short of the obstacle, or moving away from it, is not an impact.
+    assert time_of_impact(Rect(0, 0, 10, 10), 50, 0, obstacle) == -1
+    assert time_of_impact(Rect(0, 0, 10, 10), -200, 0, obstacle) == -1
+
+
+def test_time_of_impact_needs_overlap_on_both_axes():
+    obstacle = Rect(100, 100, 20, 20)
+
+    # A diagonal that passes beside the obstacle never overlaps it on both axes at once.
+    assert time_of_impact(Rect(0, 60, 10, 10), 200, 200, obstacle) == -1
+    # A diagonal that goes through it enters once the later of the two axes overlaps.
+    assert time_of_impact(Rect(0, 0, 10, 10), 200, 200, obstacle) == pytest.approx(90 / 200.0)
+    # Without movement along an axis, the bodies have to overlap on it already.
+    assert time_of_impact(Rect(0, 105, 10, 10), 200, 0, obstacle) == pytest.approx(90 / 200.0)
+    assert time_of_impact(Rect(0, 130, 10, 10), 200, 0, obstacle) == -1
+
+
+def test_time_of_impact_is_strict_like_colliderect():
+    obstacle = Rect(100, 0, 10, 10)
+
+    # Sliding along an edge, or ending up touching one, is not an impact.
+    assert time_of_impact(Rect(0, 10, 10, 10), 200, 0, obstacle) == -1
+    assert time_of_impact(Rect(0, 0, 10, 10), 90, 0, obstacle) == -1
+    # Bodies that already overlap are hit at the very start.
+    assert time_of_impact(Rect(95, 0, 10, 10), 50, 0, obstacle) == 0
+
+
+def test_clock_keeps_the_remainder_of_a_step():
+    # Quarter-second steps keep every sum exact.
+    clock = SimulationClock(0.25)
+
+    assert clock.advance(0.625) == 2
+    assert clock.accumulator == 0.125
+    assert clock.advance(0.125) == 1
+    assert clock.accumulator == 0
+    assert clock.steps == 3
+    assert clock.dropped_time == 0
+
+
+def test_clock_caps_steps_and_drops_the_excess():
+    clock = SimulationClock(0.25, 3)
+
+    # A stall of 2.125 seconds would be eight steps; only three are taken, and whole steps past them are dropped.
+    assert clock.advance(2.125) == 3
+    assert clock.dropped_time == 1.25
+    assert clock.total_dropped_time == 1.25
+    assert clock.accumulator == 0.125
+
+    # Once caught up, nothing is dropped, but the total is kept.
+    assert clock.advance(0.375) == 2
+    assert clock.dropped_time == 0
+    assert clock.total_dropped_time == 1.25
+    assert clock.steps == 5
+
+    clock.reset()
+    assert clock.accumulator == 0
+    assert clock.dropped_time == 0
+
+
+def test_dispatcher_filters_by_layer_and_mask():
+    player = Body("player", CollisionLayer.PLAYER, CollisionLayer.BOSS | CollisionLayer.BOSS_HAZARD)
+    boss = Body("boss", CollisionLayer.BOSS, CollisionLayer.PLAYER | CollisionLayer.PLAYER_BULLET)
+    hazard = Body("hazard", CollisionLayer.BOSS_HAZARD, CollisionLayer.PLAYER)
+    bullet = Body("bullet", CollisionLayer.PLAYER_BULLET, CollisionLayer.BOSS)
+    # The player never asks for its own bullets, so they are filtered even though the bullet would accept the player.
+    stray = Body("stray", CollisionLayer.PLAYER_BULLET, CollisionLayer.BOSS | CollisionLayer.PLAYER)
+
+    calls = []
+    dispatcher = CollisionDispatcher()
+    dispatcher.register(CollisionLayer.PLAYER, CollisionLayer.BOSS_HAZARD, lambda a, b: calls.append((a.name, b.name)))
+
+    dispatcher.dispatch([(player, hazard), (player, stray), (hazard, bullet), (player, boss)])
+
+    # The player and the boss accept each other, but nothing is registered for their layers.
+    assert calls == [("player", "hazard")]
+    assert dispatcher.dispatched == 1
+    assert dispatcher.filtered == 3
+
+
+def test_dispatcher_keeps_the_registered_argument_order():
+    player = Body("player", CollisionLayer.PLAYER, CollisionLayer.BOSS_HAZARD)
+    hazard = Body("hazard", CollisionLayer.BOSS_HAZARD, CollisionLayer.PLAYER)
+    first = Body("first", CollisionLayer.PLAYER_BULLET, CollisionLayer.PLAYER_BULLET)
+    second = Body("second", CollisionLayer.PLAYER_BULLET, CollisionLayer.PLAYER_BULLET)
+
+    calls = []
+    dispatcher = CollisionDispatcher()
+    dispatcher.register(CollisionLayer.PLAYER, CollisionLayer.BOSS_HAZARD, lambda a, b: calls.append((a.name, b.name)))
+    dispatcher.register(CollisionLayer.PLAYER_BULLET, CollisionLayer.PLAYER_BULLET, lambda a, b: calls.append((a.name, b.name)))
+
+    # However the broadphase orders a pair, the handler gets its arguments in the order of the layers it was registered with.
+    dispatcher.dispatch([(hazard, player), (player, hazard), (second, first)])
+
+    assert calls == [("player", "hazard"), ("player", "hazard"), ("second", "first")]
@@ -0,0 +1,96 @@
+import pytest
+from pygame import Rect
+
+from pygine.physics import CollisionLayer
+from pygine.projectiles import ProjectileManager
+
+numpy = pytest.importorskip("numpy", reason="The ProjectileManager requires NumPy.")
+
+
+BOUNDARY = Rect(0, 0, 320, 240)
+
+
+class Target:
+    def __init__(self, x, y, width, height, collision_layer=CollisionLayer.BOSS, collision_mask=CollisionLayer.PLAYER_BULLET):
+        self.bounds = Rect(x, y, width, height)
+        self.collision_layer = collision_layer
+        self.collision_mask = collision_mask
+
+
+def create_manager(hits, capacity=4):
+    return ProjectileManager(
+        None, 4, 4, CollisionLayer.PLAYER_BULLET, CollisionLayer.BOSS,
+        lambda target, damage: hits.append((target, damage)), capacity)
+
+
+def living_positions(manager):
+    return manager.position[:manager.count][manager.alive[:manager.count]].tolist()
+
+
+def test_fire_grows_and_integrates():
+    manager = create_manager([], 2)
+    for i in range(5):
+        manager.fire(10 * i, 100, 60, -30, 1000, 1)
+
+    assert manager.count == 5
+    assert len(manager.alive) >= 5
+
+    manager.integrate(0.5)
+    assert living_positions(manager) == [[10 * i + 30, 85] for i in range(5)]
+    assert manager.start[:5].tolist() == [[10 * i, 100] for i in range(5)]
+
+
+def test_cull_kills_what_travelled_too_far_or_left_the_bounds():
+    manager = create_manager([])
+    manager.fire(100, 100, 100, 0, 40, 1)
+    manager.fire(100, 100, 0, 100, 1000, 1)
+    manager.fire(300, 100, 100, 0, 1000, 1)
+    manager.fire(100, 100, -10, 0, 1000, 1)
+
+    manager.integrate(0.5)
+    manager.cull(BOUNDARY)
+
+    # The first flew 50 of its 40 pixels, and the third left the right side of the bounds.
+    assert manager.alive[:4].tolist() == [False, True, False, True]
+
+
+def test_collide_credits_the_first_target_reached():
+    hits = []
+    manager = create_manager(hits)
+    near = Target(150, 98, 10, 10)
+    far = Target(200, 98, 10, 10)
+    # Only targets whose layers accept projectiles can be hit.
+    ignored = Target(120, 98, 10, 10, CollisionLayer.PLAYER, CollisionLayer.BOSS_HAZARD)
+
+    # Fast enough to pass through both targets during one step.
+    manager.fire(100, 100, 240, 0, 1000, 3)
+    manager.fire(100, 150, 240, 0, 1000, 5)
+
+    manager.integrate(0.5)
+    manager.collide([far, ignored, near])
+
+    assert hits == [(near, 3.0)]
+    assert manager.hits == 1
+    assert manager.alive[:2].tolist() == [False, True]
+
+    # A dead projectile never hits again.
+    manager.collide([far, near])
+    assert len(hits) == 1
+
+
+def test_compact_keeps_the_order_of_the_living():
+    manager = create_manager([])
+    for i in range(6):
+        manager.fire(i, i, 0, 0, 1000, i)
+    manager.alive[[0, 2, 3]] = False
+
+    manager.compact()
+
+    assert manager.count == 3
+    assert manager.position[:3].tolist() == [[1, 1], [4, 4], [5, 5]]
+    assert manager.damage[:3].tolist() == [1, 4, 5]
+    assert manager.alive[:6].tolist() == [True, True, True, False, False, False]
+
+    manager.clear()
+    assert manager.count == 0
+    assert not manager.alive.any()
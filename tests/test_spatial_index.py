@@ -0,0 +1,259 @@
+import random
+
+import pytest
+from pygame import Rect
+
+from pygine.structures import BoundingVolumeHierarchy, IndexType, Ray, SweepAndPrune, create_spatial_index
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+BOUNDARY = Rect(0, 0, 320, 240)
+
+
+class Box:
+    def __init__(self, x, y, width, height):
+        self.bounds = Rect(x, y, width, height)
+
+
+class Wall(Box):
+    pass
+
+
+def create_boxes(seed, count=120):
+    # Some boxes stick out of the boundary, and a few lie entirely outside of it.
+    generator = random.Random(seed)
+    boxes = []
+    for i in range(count):
+        box_type = Wall if i % 5 == 0 else Box
+        boxes.append(box_type(
+            generator.randint(-40, BOUNDARY.right + 20),
+            generator.randint(-40, BOUNDARY.bottom + 20),
+            generator.randint(1, 48),
+            generator.randint(1, 48)
+        ))
+
+    return boxes
+
+
+def create_areas(seed, count=60):
+    generator = random.Random(seed)
+    areas = [Rect(BOUNDARY), Rect(-100, -100, 50, 50), Rect(400, 300, 10, 10)]
+    for i in range(count):
+        areas.append(Rect(
+            generator.randint(-20, BOUNDARY.right),
+            generator.randint(-20, BOUNDARY.bottom),
+            generator.randint(1, 120),
+            generator.randint(1, 120)
+        ))
+
+    return areas
+
+
+def create_rays(seed, count=40):
+    generator = random.Random(seed)
+    rays = [Ray(-10, 100.5, 1, 0), Ray(160.5, 300, 0, -1, 250)]
+    for i in range(count):
+        rays.append(Ray(
+            generator.uniform(0, BOUNDARY.right),
+            generator.uniform(0, BOUNDARY.bottom),
+            generator.uniform(-1, 1) or 1,
+            generator.uniform(-1, 1),
+            generator.choice((float("inf"), generator.uniform(10, 200)))
+        ))
+
+    return rays
+
+
+def brute_force_query(boxes, area, kind=None, exclude=None, boundary=BOUNDARY):
+    if boundary != None and not area.colliderect(boundary):
+        return set()
+
+    return set(
+        id(e) for e in boxes
+        if (boundary == None or e.bounds.colliderect(boundary)) and e.bounds.colliderect(area) and e is not exclude and
+        (kind == None or isinstance(e, kind))
+    )
+
+
+def check_queries(spatial_index, boxes, areas):
+    for area in areas:
+        found = spatial_index.query(area)
+        assert len(found) == len(set(id(e) for e in found))
+        assert set(id(e) for e in found) == brute_force_query(boxes, area)
+
+
+@pytest.fixture(params=[IndexType.QUADTREE, IndexType.LINKED_QUADTREE, IndexType.GRID], ids=lambda t: t.name)
+def spatial_index(request):
+    if request.param == IndexType.GRID and numpy == None:
+        pytest.skip("The grid requires NumPy.")
+
+    return create_spatial_index(request.param, Rect(BOUNDARY), 4, 6, 5)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_query_after_insert(spatial_index, seed):
+    boxes = create_boxes(seed)
+    for box in boxes:
+        spatial_index.insert(box)
+
+    check_queries(spatial_index, boxes, create_areas(seed))
+
+
+def test_insert_twice_keeps_one_copy(spatial_index):
+    boxes = create_boxes(4)
+    for box in boxes:
+        spatial_index.insert(box)
+    for box in boxes:
+        spatial_index.insert(box)
+
+    check_queries(spatial_index, boxes, create_areas(4))
+
+
+@pytest.mark.parametrize("seed", [5, 6])
+def test_query_after_move(spatial_index, seed):
+    boxes = create_boxes(seed)
+    for box in boxes:
+        spatial_index.insert(box)
+
+    generator = random.Random(seed)
+    for step in range(4):
+        for box in boxes:
+            box.bounds.move_ip(generator.randint(-30, 30), generator.randint(-30, 30))
+            spatial_index.move(box)
+        check_queries(spatial_index, boxes, create_areas(seed + step))
+
+
+def test_query_after_remove(spatial_index):
+    boxes = create_boxes(7)
+    for box in boxes:
+        spatial_index.insert(box)
+
+    for box in boxes[::2]:
+        spatial_index.remove(box)
+    check_queries(spatial_index, boxes[1::2], create_areas(7))
+
+    spatial_index.clear()
+    check_queries(spatial_index, [], create_areas(7))
+
+
+@pytest.mark.parametrize("index_type", [IndexType.QUADTREE, IndexType.LINKED_QUADTREE], ids=lambda t: t.name)
+def test_quadtree_version_changes_on_relocation(index_type):
+    tree = create_spatial_index(index_type, Rect(BOUNDARY), 4, 6, 5)
+    box = Box(10, 10, 8, 8)
+    tree.insert(box)
+
+    # Everything fits in the root while it is not divided, so moving around does not relocate anything.
+    version = tree.version
+    box.bounds.move_ip(200, 100)
+    assert tree.move(box)
+    assert tree.version == version
+
+    for i in range(5):
+        tree.insert(Box(4 + i * 10, 4, 8, 8))
+    version = tree.version
+    box.bounds.move_ip(-4, -4)
+    assert tree.move(box)
+    assert tree.version == version
+
+    box.bounds.topleft = (10, 10)
+    assert tree.move(box)
+    assert tree.version != version
+
+
+@pytest.mark.parametrize("index_type", [IndexType.QUADTREE, IndexType.LINKED_QUADTREE], ids=lambda t: t.name)
+def test_quadtree_collapses_empty_nodes(index_type):
+    tree = create_spatial_index(index_type, Rect(BOUNDARY), 4, 6, 5)
+    boxes = create_boxes(15)
+    for box in boxes:
+        tree.insert(box)
+
+    # Gathering everything in one corner empties the rest of the tree, and removing everything empties all of it.
+    for box in boxes:
+        box.bounds.topleft = (1, 1)
+        box.bounds.size = (2, 2)
+        tree.move(box)
+    check_queries(tree, boxes, create_areas(15))
+    for box in boxes:
+        tree.remove(box)
+    check_queries(tree, [], create_areas(15))
+    if index_type == IndexType.LINKED_QUADTREE:
+        assert not tree.divided
+
+    # Collapsed nodes are reused.
+    boxes = create_boxes(16)
+    for box in boxes:
+        tree.insert(box)
+    check_queries(tree, boxes, create_areas(16))
+
+
+@pytest.mark.parametrize("kind", [Wall, (Wall, Box)], ids=["type", "tuple"])
+def test_query_filters(spatial_index, kind):
+    boxes = create_boxes(8)
+    for box in boxes:
+        spatial_index.insert(box)
+
+    for area in create_areas(8):
+        found = spatial_index.query(area, [], kind, boxes[0])
+        assert set(id(e) for e in found) == brute_force_query(boxes, area, kind, boxes[0])
+
+
+def test_query_fills_result(spatial_index):
+    boxes = create_boxes(9)
+    for box in boxes:
+        spatial_index.insert(box)
+
+    result = [boxes[0]]
+    assert spatial_index.query(Rect(-100, -100, 1, 1), result) is result
+    assert len(result) == 0
+
+
+@pytest.mark.parametrize("seed", [10, 11])
+def test_query_ray(spatial_index, seed):
+    boxes = create_boxes(seed)
+    for box in boxes:
+        spatial_index.insert(box)
+
+    for ray in create_rays(seed):
+        hits = spatial_index.query_ray(ray)
+        distances = [hit[0] for hit in hits]
+        assert distances == sorted(distances)
+
+        # Whatever the ray hits inside the boundary has to be found. Parts of boxes that stick out of the boundary may or may not be.
+        found = set(id(hit[1]) for hit in hits)
+        required = set(
+            id(e) for e in boxes
+            if e.bounds.colliderect(BOUNDARY) and ray.intersects(e.bounds.clip(BOUNDARY)) >= 0)
+        possible = set(id(e) for e in boxes if ray.intersects(e.bounds) >= 0)
+        assert required <= found <= possible
+
+        first = spatial_index.query_ray_first(ray)
+        if len(required) == 0:
+            continue
+        assert first != None and first[0] == min(ray.intersects(e.bounds) for e in boxes if id(e) in found)
+
+
+# The sweep and the hierarchy are rebuilt in bulk instead of being kept up to date one object at a time,
+# so they only share the queries of SpatialIndex, and are checked against the same brute-force search.
+@pytest.mark.parametrize("seed", [12, 13])
+def test_bulk_structures_query(seed):
+    boxes = [e for e in create_boxes(seed) if e.bounds.colliderect(BOUNDARY)]
+
+    sweep = SweepAndPrune()
+    sweep.update(boxes)
+    hierarchy = BoundingVolumeHierarchy()
+    hierarchy.build(boxes)
+
+    result = []
+    for area in create_areas(seed):
+        expected = brute_force_query(boxes, area, boundary=None)
+        assert set(id(e) for e in sweep.query(area)) == expected
+        assert set(id(e) for e in hierarchy.query(area, result)) == expected
+
+    for ray in create_rays(seed):
+        expected = set(id(e) for e in boxes if ray.intersects(e.bounds) >= 0)
+        assert set(id(hit[1]) for hit in sweep.query_ray(ray)) == expected
+        assert set(id(hit[1]) for hit in hierarchy.query_ray(ray)) == expected